@@ -0,0 +1,81 @@
+"""
+Measure event-loop lag while the product read path runs under concurrent load,
+once with the sync helpers called from coroutines (the old handler behaviour)
+and once with the asyncpg based helpers.
+
+A ticker coroutine sleeps for --tick ms in a loop and records how late it
+wakes up; that overshoot is what every other request and Socket.IO connection
+on the worker waits for. Needs POSTGRES_URL pointing at a database with the
+products table:
+
+    python -m benchmarks.db_loop_lag --asin B0DGJ7HYG1 --concurrency 50 --requests 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.app.database.read import async_main, main as sync_main
+
+
+async def sync_read(asin: str):
+    if sync_main.asin_exists(asin):
+        sync_main.fetch_product_by_asin(asin)
+
+
+async def async_read(asin: str):
+    if await async_main.asin_exists(asin):
+        await async_main.fetch_product_by_asin(asin)
+
+
+async def ticker(tick: float, lags: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(tick)
+        lags.append(loop.time() - started - tick)
+
+
+async def run(read, asin: str, concurrency: int, requests: int, tick: float):
+    lags = []
+    stop = asyncio.Event()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await read(asin)
+
+    await read(asin)  # warm the connection pool
+    ticker_task = asyncio.create_task(ticker(tick, lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker_task
+    return elapsed, lags
+
+
+def report(name: str, requests: int, elapsed: float, lags: list):
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"{name:<6}{requests / elapsed:>10.0f} req/s"
+        f"{statistics.median(lags_ms):>10.1f}{p99:>10.1f}{lags_ms[-1]:>10.1f}  ms lag (p50/p99/max)"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asin", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--tick", type=float, default=10, help="ticker interval in ms")
+    args = parser.parse_args()
+
+    for name, read in (("sync", sync_read), ("async", async_read)):
+        elapsed, lags = await run(read, args.asin, args.concurrency, args.requests, args.tick / 1000)
+        report(name, args.requests, elapsed, lags)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Compare parse time and peak memory of the product page parse modes.
+
+Fixtures are raw product pages saved as benchmarks/fixtures/amazon/<ASIN>.html.
+Capture them once through the scraper pool with:
+
+    python -m benchmarks.parse_benchmark --capture B0DGJ7HYG1 B0CHX1W1XY
+
+then run the comparison with:
+
+    python -m benchmarks.parse_benchmark --repeat 5
+
+"tags" is the number of elements in the parsed tree and "same output" checks
+the extracted details against html.parser, so a strainer that drops something
+AmazonScraper reads shows up as False.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from dibkb_scraper import AmazonScraper
+
+from src.app.scraper.parse import PARSE_MODES, make_soup
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "amazon"
+
+
+async def capture(asins):
+    from src.app.scraper.pool import ScraperPool
+
+    pool = ScraperPool()
+    await pool.initialize()
+    try:
+        for asin in asins:
+            html = await pool.get_html_content(f"https://www.amazon.in/dp/{asin}")
+            if html is None:
+                print(f"{asin}: failed to fetch")
+                continue
+            (FIXTURES_DIR / f"{asin}.html").write_text(html, encoding="utf-8")
+            print(f"{asin}: saved {len(html) / 1024:.0f} KiB")
+    finally:
+        await pool.close()
+
+
+def run_mode(asin: str, html: str, mode: str):
+    started = time.perf_counter()
+    soup = make_soup(html, mode)
+    parsed = time.perf_counter()
+    details = AmazonScraper(asin, soup).get_all_details()
+    finished = time.perf_counter()
+    return parsed - started, finished - started, details
+
+
+def peak_memory(asin: str, html: str, mode: str) -> int:
+    tracemalloc.start()
+    AmazonScraper(asin, make_soup(html, mode)).get_all_details()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark(repeat: int):
+    fixtures = sorted(FIXTURES_DIR.glob("*.html"))
+    if not fixtures:
+        print(f"No fixtures in {FIXTURES_DIR}, capture some with --capture <ASIN> first")
+        return
+
+    print(f"{'fixture':<14}{'size KiB':>10}{'mode':>16}{'tags':>8}{'parse ms':>10}{'total ms':>10}{'peak MiB':>10}  same output")
+    for path in fixtures:
+        asin = path.stem
+        html = path.read_text(encoding="utf-8")
+        baseline = None
+        for mode in PARSE_MODES:
+            parse_times, total_times = [], []
+            for _ in range(repeat):
+                parse_time, total_time, details = run_mode(asin, html, mode)
+                parse_times.append(parse_time)
+                total_times.append(total_time)
+            if baseline is None:
+                baseline = details
+            print(
+                f"{asin:<14}{len(html) / 1024:>10.0f}{mode:>16}{len(make_soup(html, mode).find_all(True)):>8}"
+                f"{statistics.median(parse_times) * 1000:>10.1f}{statistics.median(total_times) * 1000:>10.1f}"
+                f"{peak_memory(asin, html, mode) / 2**20:>10.1f}  {details == baseline}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capture", nargs="+", metavar="ASIN", help="fetch and save product pages as fixtures")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per fixture and mode")
+    args = parser.parse_args()
+
+    if args.capture:
+        FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+        asyncio.run(capture(args.capture))
+    else:
+        benchmark(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ...product_sage.improvement import ProductImprovementSchema
+from ...product_sage.sentiment import SentimentSchema
+from ...product_sage.web_reviewer import ReviewSchema
+from ..cache import row_cache
+from ..main import AsyncSessionLocal
+from ..retry import with_retry
+from ..models import Product, ProductEnhancements, ProductReview, ProductSage, ProductWebReviewer
+from . import statements
+
+
+async def _upsert_batches(db, build: Callable, rows: List[Dict[str, Any]]) -> List[str]:
+    written = []
+    for batch in statements.batches(rows):
+        written.extend(await db.scalars(build(batch)))
+    return written
+
+@with_retry
+async def _upsert(model, rows: List[Dict[str, Any]], build: Callable) -> List[str]:
+    """One multi-values upsert per batch, returns the asins written."""
+    if not rows:
+        return []
+    async with AsyncSessionLocal() as db:
+        try:
+            written = await _upsert_batches(db, build, rows)
+            await db.commit()
+            for row in rows:
+                row_cache.invalidate((model.__tablename__, row["asin"]))
+            return written
+        except Exception as e:
+            await db.rollback()
+            print(f"Error upserting {model.__tablename__}: {e}")
+            raise
+
+@with_retry
+async def upsert_products(products: Dict[str, Any], scraped_at: Optional[datetime] = None) -> List[str]:
+    """Insert or replace many products (asin -> scraped details) and store their new reviews."""
+    if not products:
+        return []
+    async with AsyncSessionLocal() as db:
+        try:
+            values = [statements.product_values(data, asin) for asin, data in products.items()]
+            reviews = [review for asin, data in products.items() for review in statements.review_values(data, asin)]
+            written = await _upsert_batches(db, lambda batch: statements.upsert_products(batch, scraped_at), values)
+            for batch in statements.batches(reviews):
+                await db.execute(statements.insert_product_reviews(batch))
+            await db.commit()
+            for asin in products:
+                row_cache.invalidate((Product.__tablename__, asin))
+                row_cache.invalidate((ProductReview.__tablename__, asin))
+            return written
+        except Exception as e:
+            await db.rollback()
+            print(f"Error upserting products: {e}")
+            raise
+
+async def upsert_product(product_data, asin: str, scraped_at: Optional[datetime] = None):
+    await upsert_products({asin: product_data}, scraped_at)
+    return statements.with_review_text(
+        statements.product_values(product_data, asin),
+        statements.review_values(product_data, asin),
+    )
+
+async def create_product(product_data, asin: str):
+    # a concurrent scrape of the same asin replaces the row instead of failing
+    return await upsert_product(product_data, asin, scraped_at=datetime.now())
+
+@with_retry
+async def update_review_analysis(asin: str, analyses: List[Dict]):
+    """Store translation and sentiment per review, analyses are {content_hash, language, translation, sentiment}."""
+    if not analyses:
+        return
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(statements.update_review_analysis(), [{"asin": asin, **analysis} for analysis in analyses])
+            await db.commit()
+            row_cache.invalidate((ProductReview.__tablename__, asin))
+        except Exception as e:
+            await db.rollback()
+            print(f"Error updating review analysis: {e}")
+            raise
+
+async def upsert_product_enhancements(enhancements: Dict[str, Any]) -> List[str]:
+    created_at = datetime.now()
+    rows = [{"asin": asin, "enhancements": json_data, "created_at": created_at} for asin, json_data in enhancements.items()]
+    return await _upsert(ProductEnhancements, rows, statements.upsert_product_enhancements)
+
+async def create_product_enhancements(json_data, asin: str):
+    await upsert_product_enhancements({asin: json_data})
+    return {"asin": asin, "enhancements": json_data}
+
+async def upsert_product_sages(sages: Dict[str, Tuple[List[ProductImprovementSchema], List[SentimentSchema], Optional[str], Optional[Dict[str, float]], Optional[List[float]], Optional[List[int]]]]) -> List[str]:
+    """asin -> (improvements, sentiments, review_set, improvement_mix, weights, review_indexes)."""
+    rows = [
+        {
+            "asin": asin,
+            "improvements": [improvement.model_dump() for improvement in improvements],
+            "sentiments": [sentiment.model_dump() for sentiment in sentiments],
+            "review_set": review_set,
+            "improvement_mix": improvement_mix,
+            "weights": weights,
+            "review_indexes": review_indexes,
+        }
+        for asin, (improvements, sentiments, review_set, improvement_mix, weights, review_indexes) in sages.items()
+    ]
+    return await _upsert(ProductSage, rows, statements.upsert_product_sages)
+
+async def create_product_sage(improvements: List[ProductImprovementSchema], sentiments: List[SentimentSchema], asin: str, review_set: Optional[str] = None, improvement_mix: Optional[Dict[str, float]] = None, weights: Optional[List[float]] = None, review_indexes: Optional[List[int]] = None):
+    await upsert_product_sages({asin: (improvements, sentiments, review_set, improvement_mix, weights, review_indexes)})
+    return {
+        "improvements": improvements,
+        "sentiments": sentiments,
+        "review_set": review_set,
+        "improvement_mix": improvement_mix,
+        "weights": weights,
+        "review_indexes": review_indexes,
+    }
+
+async def upsert_product_web_reviewers(web_reviews: Dict[str, List[ReviewSchema]]) -> List[str]:
+    rows = [
+        {"asin": asin, "reviews": [review.model_dump() for review in reviews]}
+        for asin, reviews in web_reviews.items()
+    ]
+    return await _upsert(ProductWebReviewer, rows, statements.upsert_product_web_reviewers)
+
+async def create_product_web_reviewer(reviews: List[ReviewSchema], asin: str):
+    await upsert_product_web_reviewers({asin: reviews})
+    return reviews
+
+@with_retry
+async def create_html_archive(content_hash: str, html: bytes, size: int, asin: str):
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(statements.insert_html_archive(content_hash, html, size))
+            await db.execute(statements.upsert_product_page(asin, content_hash))
+            await db.commit()
+            return content_hash
+        except Exception as e:
+            await db.rollback()
+            print(f"Error archiving html: {e}")
+            raise
+
+@with_retry
+async def record_product_reads(reads: Dict[str, int], read_at: datetime):
+    async with AsyncSessionLocal() as db:
+        try:
+            for asin, count in reads.items():
+                await db.execute(statements.update_product_reads(asin, count, read_at))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(f"Error recording product reads: {e}")
+            raise
@@ -0,0 +1,143 @@
+"""Insert/update statements shared by the sync and async create helpers."""
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+
+from ....config.main import settings
+from ..models import HtmlArchive, Product, ProductEnhancements, ProductPage, ProductReview, ProductSage, ProductWebReviewer
+
+
+def _as_dict(product_data) -> dict:
+    # Ensure product_data is a dictionary or a Pydantic model
+    if isinstance(product_data, BaseModel):
+        # Convert Pydantic model to dictionary
+        return product_data.dict()
+    if isinstance(product_data, str):
+        # If product_data is a string, you might need to parse it (if it's JSON)
+        return json.loads(product_data)
+    return product_data
+
+
+def review_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def review_set_hash(review_hashes: List[str]) -> str:
+    """Identifies a set of reviews regardless of page order or repeats."""
+    return hashlib.sha256("\n".join(sorted(set(review_hashes))).encode("utf-8")).hexdigest()
+
+
+def product_values(product_data, asin: str) -> dict:
+    product_data = _as_dict(product_data)
+    reviews = product_data["reviews"] or []
+
+    return {
+        "asin": asin,
+        "title": product_data["title"],
+        "image": product_data["image"],
+        "price": product_data["price"],
+        "categories": product_data["categories"],
+        "description": product_data["description"],
+        "specifications": product_data["specifications"],
+        "ratings": product_data["ratings"],
+        "review_hashes": [review_hash(review) for review in reviews],
+        "related_products": product_data["related_products"]
+    }
+
+
+def review_values(product_data, asin: str) -> List[Dict[str, Any]]:
+    """One product_reviews row per distinct review text."""
+    reviews = _as_dict(product_data)["reviews"] or []
+    created_at = datetime.now()
+    rows = {
+        review_hash(review): {"asin": asin, "content_hash": review_hash(review), "text": review, "created_at": created_at}
+        for review in reviews
+    }
+    return list(rows.values())
+
+
+def with_review_text(values: dict, reviews: List[Dict[str, Any]]) -> dict:
+    """The stored product values with the review text put back, as the API returns them."""
+    text = {review["content_hash"]: review["text"] for review in reviews}
+    return {**values, "reviews": [text[content_hash] for content_hash in values["review_hashes"]]}
+
+
+def batches(rows: List[Dict[str, Any]], size: int = settings.UPSERT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Split rows into multi-values statements, keeping each under the bind parameter limit."""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _upsert(model, rows: List[Dict[str, Any]], set_: Optional[Dict[str, Any]] = None):
+    # one row per asin, ON CONFLICT DO UPDATE cannot touch the same row twice in a statement
+    rows = list({row["asin"]: row for row in rows}.values())
+    query = insert(model).values(rows)
+    excluded = {key: query.excluded[key] for key in rows[0] if key != "asin"}
+    return (
+        query.on_conflict_do_update(index_elements=[model.asin], set_={**excluded, **(set_ or {})})
+        .returning(model.asin)
+    )
+
+
+def upsert_products(rows: List[Dict[str, Any]], scraped_at: Optional[datetime] = None):
+    """
+    Insert or replace products. Pass scraped_at for a fresh scrape; without it
+    (e.g. a reparse of an archived page) the stored scrape time is kept.
+    """
+    if scraped_at is None:
+        return _upsert(Product, rows)
+    # reads are counted per scrape so the sweeper favours rows hot since their last refresh
+    return _upsert(Product, [{**row, "scraped_at": scraped_at} for row in rows], {"read_count": 0})
+
+
+def insert_product_reviews(reviews: List[Dict[str, Any]]):
+    # reviews already stored for the asin keep their translation and sentiment
+    return insert(ProductReview).values(reviews).on_conflict_do_nothing(
+        index_elements=[ProductReview.asin, ProductReview.content_hash]
+    )
+
+
+def update_review_analysis():
+    """Bulk UPDATE by primary key, execute with a list of {asin, content_hash, language, translation, sentiment}."""
+    return update(ProductReview)
+
+
+def upsert_product_enhancements(rows: List[Dict[str, Any]]):
+    return _upsert(ProductEnhancements, rows)
+
+
+def upsert_product_sages(rows: List[Dict[str, Any]]):
+    return _upsert(ProductSage, rows)
+
+
+def upsert_product_web_reviewers(rows: List[Dict[str, Any]]):
+    return _upsert(ProductWebReviewer, rows)
+
+
+def insert_html_archive(content_hash: str, html: bytes, size: int):
+    return (
+        insert(HtmlArchive)
+        .values(content_hash=content_hash, html=html, size=size, created_at=datetime.now())
+        .on_conflict_do_nothing(index_elements=[HtmlArchive.content_hash])
+    )
+
+
+def upsert_product_page(asin: str, content_hash: str):
+    query = insert(ProductPage).values(asin=asin, content_hash=content_hash, fetched_at=datetime.now())
+    return query.on_conflict_do_update(
+        index_elements=[ProductPage.asin, ProductPage.content_hash],
+        set_={"fetched_at": query.excluded.fetched_at}
+    )
+
+
+def update_product_reads(asin: str, count: int, read_at: datetime):
+    return (
+        update(Product)
+        .where(Product.asin == asin)
+        .values(last_read_at=read_at, read_count=Product.read_count + count)
+    )
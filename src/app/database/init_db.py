@@ -1,6 +1,7 @@
 from contextlib import contextmanager
 from sqlalchemy import text
 from .main import Base, engine, SessionLocal
+from .migrations import run_migrations
 from sqlalchemy.exc import SQLAlchemyError
 
 def test_db_connection(engine) -> bool:
@@ -23,6 +24,7 @@ def init_db():
 
         # Create database tables
         Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
 
         # Test database connection
         if not test_db_connection(engine):
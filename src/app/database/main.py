@@ -1,20 +1,51 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from ...config.main import settings
+from .pool import TimedAsyncQueuePool, TimedQueuePool
 
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("POSTGRES_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    # reconnect before the server or a proxy drops an idle connection
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+def make_async_url(database_url: str):
+    """Point a libpq style POSTGRES_URL at asyncpg, moving sslmode into connect args."""
+    url = make_url(database_url)
+    query = dict(url.query)
+    connect_args = {}
+    if "sslmode" in query:
+        connect_args["ssl"] = query.pop("sslmode")
+    # libpq only options asyncpg would reject
+    query.pop("channel_binding", None)
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+
+ASYNC_DATABASE_URL, ASYNC_CONNECT_ARGS = make_async_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=ASYNC_CONNECT_ARGS, poolclass=TimedAsyncQueuePool, **POOL_OPTIONS
+)
 
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
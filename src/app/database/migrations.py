@@ -0,0 +1,74 @@
+from sqlalchemy import text
+
+# create_all only creates missing tables, so column and type changes to
+# existing tables are applied here. Every statement must be idempotent.
+JSONB_COLUMNS = {
+    "products": ["image", "categories", "description", "specifications", "ratings", "reviews", "related_products"],
+    "product_sages": ["improvements", "sentiments"],
+    "product_enhancements": ["enhancements"],
+    "product_web_reviewer": ["reviews"],
+}
+
+
+def json_to_jsonb(table: str, column: str) -> str:
+    # only rewrite columns still stored as json, so the migration runs once
+    return f"""
+    DO $$ BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = '{table}' AND column_name = '{column}' AND data_type = 'json'
+        ) THEN
+            ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb;
+        END IF;
+    END $$
+    """
+
+
+# products.reviews held every review as one JSON array; copy each review into
+# product_reviews once and record the page order in review_hashes. The legacy
+# column is no longer mapped and is left in place for now. The hash matches
+# statements.review_hash (sha256 over the UTF-8 text).
+BACKFILL_PRODUCT_REVIEWS = """
+DO $$ BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'products' AND column_name = 'reviews'
+    ) THEN
+        INSERT INTO product_reviews (asin, content_hash, text, created_at)
+        SELECT p.asin, encode(sha256(convert_to(r.value, 'UTF8')), 'hex'), r.value, now()
+        FROM products p CROSS JOIN LATERAL jsonb_array_elements_text(p.reviews) AS r(value)
+        WHERE p.review_hashes IS NULL AND jsonb_typeof(p.reviews) = 'array'
+        ON CONFLICT DO NOTHING;
+
+        UPDATE products p SET review_hashes = COALESCE((
+            SELECT jsonb_agg(encode(sha256(convert_to(r.value, 'UTF8')), 'hex') ORDER BY r.position)
+            FROM jsonb_array_elements_text(p.reviews) WITH ORDINALITY AS r(value, position)
+        ), '[]'::jsonb)
+        WHERE p.review_hashes IS NULL AND jsonb_typeof(p.reviews) = 'array';
+    END IF;
+END $$
+"""
+
+
+MIGRATIONS = [
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS scraped_at TIMESTAMP DEFAULT now()",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS last_read_at TIMESTAMP",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS read_count INTEGER NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_products_scraped_at ON products (scraped_at)",
+    *[json_to_jsonb(table, column) for table, columns in JSONB_COLUMNS.items() for column in columns],
+    "CREATE INDEX IF NOT EXISTS ix_products_categories ON products USING GIN (categories)",
+    "CREATE INDEX IF NOT EXISTS ix_products_specifications_technical ON products USING GIN ((specifications -> 'technical'))",
+    "CREATE INDEX IF NOT EXISTS ix_products_specifications_additional ON products USING GIN ((specifications -> 'additional'))",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS review_hashes JSONB",
+    BACKFILL_PRODUCT_REVIEWS,
+    "ALTER TABLE product_sages ADD COLUMN IF NOT EXISTS review_set VARCHAR(64)",
+    "ALTER TABLE product_sages ADD COLUMN IF NOT EXISTS improvement_mix JSONB",
+    "ALTER TABLE product_sages ADD COLUMN IF NOT EXISTS weights JSONB",
+    "ALTER TABLE product_sages ADD COLUMN IF NOT EXISTS review_indexes JSONB",
+]
+
+
+def run_migrations(engine):
+    with engine.begin() as connection:
+        for statement in MIGRATIONS:
+            connection.execute(text(statement))
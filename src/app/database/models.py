@@ -1,5 +1,6 @@
 from .init_db import Base
-from sqlalchemy import Column, String, Text, DECIMAL,JSON,DateTime
+from sqlalchemy import Column, String, Text, DECIMAL,DateTime,LargeBinary,Integer
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 
 class Product(Base):
@@ -7,29 +8,65 @@ class Product(Base):
     asin = Column(String(20), primary_key=True)
     title = Column(Text, nullable=False)
     price = Column(DECIMAL(10,2), nullable=False)
-    image = Column(JSON,nullable=True)
-    categories = Column(JSON,nullable=True)
-    description = Column(JSON,nullable=True)
-    specifications = Column(JSON,nullable=True)
-    ratings = Column(JSON,nullable=True)
-    reviews = Column(JSON,nullable=True)
-    related_products = Column(JSON,nullable=True)
+    image = Column(JSONB,nullable=True)
+    categories = Column(JSONB,nullable=True)
+    description = Column(JSONB,nullable=True)
+    specifications = Column(JSONB,nullable=True)
+    ratings = Column(JSONB,nullable=True)
+    # content hashes of the scraped reviews in page order, the text is in product_reviews
+    review_hashes = Column(JSONB,nullable=True)
+    related_products = Column(JSONB,nullable=True)
+    scraped_at = Column(DateTime, default=datetime.now, index=True)
+    last_read_at = Column(DateTime, nullable=True)
+    read_count = Column(Integer, nullable=False, default=0)
+
+class ProductReview(Base):
+    __tablename__ = 'product_reviews'
+    asin = Column(String(20), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=False)
+    language = Column(String(32), nullable=True)
+    translation = Column(Text, nullable=True)
+    sentiment = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
 
 class ProductSage(Base):
     __tablename__ = 'product_sages'
     asin = Column(String(20), primary_key=True)
-    improvements = Column(JSON,nullable=True)
-    sentiments = Column(JSON,nullable=True)
+    improvements = Column(JSONB,nullable=True)
+    sentiments = Column(JSONB,nullable=True)
+    # review_set_hash of the reviews the sentiments cover, and the sentiment mix the improvements were generated from
+    review_set = Column(String(64), nullable=True)
+    improvement_mix = Column(JSONB, nullable=True)
+    # reviews each sentiment stands for after dedupe and sampling
+    weights = Column(JSONB, nullable=True)
+    # position in the product's reviews of the review each sentiment belongs to
+    review_indexes = Column(JSONB, nullable=True)
 
 class ProductEnhancements(Base):
     __tablename__ = 'product_enhancements'
     asin = Column(String(20), primary_key=True)
-    enhancements = Column(JSON,nullable=True)
+    enhancements = Column(JSONB,nullable=True)
     created_at = Column(DateTime, default=datetime.now())
 
 
 class ProductWebReviewer(Base):
     __tablename__ = 'product_web_reviewer'
     asin = Column(String(20), primary_key=True)
-    reviews = Column(JSON,nullable=True)
-    created_at = Column(DateTime, default=datetime.now())
\ No newline at end of file
+    reviews = Column(JSONB,nullable=True)
+    created_at = Column(DateTime, default=datetime.now())
+
+
+class HtmlArchive(Base):
+    __tablename__ = 'html_archive'
+    content_hash = Column(String(64), primary_key=True)
+    html = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class ProductPage(Base):
+    __tablename__ = 'product_pages'
+    asin = Column(String(20), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    fetched_at = Column(DateTime, default=datetime.now, index=True)
\ No newline at end of file
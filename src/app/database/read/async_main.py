@@ -0,0 +1,171 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import case, exists, func, literal_column, or_, select
+
+from ..cache import row_cache
+from ..main import AsyncSessionLocal
+from ..retry import with_retry
+from ..models import HtmlArchive, Product, ProductEnhancements, ProductPage, ProductReview, ProductSage, ProductWebReviewer
+
+
+@with_retry
+async def _exists(model, asin: str) -> bool:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(exists().where(model.asin == asin)))
+
+@with_retry
+async def _fetch_by_asin(model, asin: str) -> Optional[dict]:
+    """Read-through lookup, returns None when the asin has no row."""
+    key = (model.__tablename__, asin)
+    cached = row_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async with AsyncSessionLocal() as db:
+        row = await db.scalar(select(model).where(model.asin == asin))
+        encoded = jsonable_encoder(row)
+    # misses are not cached, another worker may create the row at any time
+    if encoded is not None:
+        row_cache.set(key, encoded)
+    return encoded
+
+
+async def asin_exists(asin: str) -> bool:
+    return await _exists(Product, asin)
+
+async def asin_exists_sage(asin: str) -> bool:
+    return await _exists(ProductSage, asin)
+
+async def product_enhancements_exists(asin: str) -> bool:
+    return await _exists(ProductEnhancements, asin)
+
+async def product_web_reviewer_exists(asin: str) -> bool:
+    return await _exists(ProductWebReviewer, asin)
+
+async def fetch_product_by_asin(asin: str) -> Optional[dict]:
+    return await _fetch_by_asin(Product, asin)
+
+async def fetch_product_sage_by_asin(asin: str) -> Optional[dict]:
+    return await _fetch_by_asin(ProductSage, asin)
+
+async def fetch_product_enhancements_by_asin(asin: str) -> Optional[dict]:
+    return await _fetch_by_asin(ProductEnhancements, asin)
+
+async def fetch_product_web_reviewer_by_asin(asin: str) -> Optional[dict]:
+    return await _fetch_by_asin(ProductWebReviewer, asin)
+
+
+@with_retry
+async def fetch_product_fields(asin: str, fields: List[str]) -> Optional[dict]:
+    """Only the given top-level product columns, e.g. ["description", "specifications"]."""
+    cached = row_cache.get((Product.__tablename__, asin))
+    if cached is not None:
+        return {field: cached[field] for field in fields}
+
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(*[getattr(Product, field) for field in fields]).where(Product.asin == asin)
+        )).first()
+        return jsonable_encoder(dict(row._mapping)) if row else None
+
+@with_retry
+async def fetch_product_reviews(asin: str, review_hashes: List[str]) -> List[dict]:
+    """The product's reviews in page order (its review_hashes), with any stored translation and sentiment."""
+    if not review_hashes:
+        return []
+    key = (ProductReview.__tablename__, asin)
+    by_hash = row_cache.get(key)
+    if by_hash is None:
+        async with AsyncSessionLocal() as db:
+            rows = await db.scalars(select(ProductReview).where(ProductReview.asin == asin))
+            by_hash = {row.content_hash: jsonable_encoder(row) for row in rows}
+        row_cache.set(key, by_hash)
+    return [by_hash[content_hash] for content_hash in review_hashes if content_hash in by_hash]
+
+@with_retry
+async def fetch_existing_asins(asins: List[str]) -> Set[str]:
+    if not asins:
+        return set()
+    async with AsyncSessionLocal() as db:
+        result = await db.scalars(select(Product.asin).where(Product.asin.in_(asins)))
+        return set(result)
+
+@with_retry
+async def fetch_stale_asins(stale_before: datetime, limit: int, exclude: Sequence[str] = ()) -> List[str]:
+    """Stale products, most read since their last scrape first."""
+    query = select(Product.asin).where(or_(Product.scraped_at == None, Product.scraped_at < stale_before))
+    if exclude:
+        query = query.where(Product.asin.not_in(exclude))
+    async with AsyncSessionLocal() as db:
+        result = await db.scalars(
+            query.order_by(Product.read_count.desc(), Product.last_read_at.desc().nullslast()).limit(limit)
+        )
+        return list(result)
+
+
+# specification sections with a GIN expression index, see migrations.py
+INDEXED_SPECIFICATIONS = ("technical", "additional")
+
+
+def _product_summaries(category: Optional[str] = None, specification: Optional[str] = None, section: str = "technical"):
+    # only the first image leaves the database; non-array values pass through as before
+    image = case(
+        (func.jsonb_typeof(Product.image) == "array", Product.image[0]),
+        else_=Product.image,
+    )
+    query = select(Product.asin, Product.title, Product.price, image.label("image")).order_by(Product.asin)
+    if category:
+        query = query.where(Product.categories.contains([category]))
+    if specification:
+        if section not in INDEXED_SPECIFICATIONS:
+            raise ValueError(f"Unknown specification section: {section}")
+        # a literal key so the planner can match the (specifications -> 'section') index
+        query = query.where(Product.specifications.op("->")(literal_column(f"'{section}'")).op("?")(specification))
+    return query
+
+@with_retry
+async def fetch_all_products() -> list:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(_product_summaries())).all()
+        return jsonable_encoder([dict(row._mapping) for row in rows])
+
+@with_retry
+async def fetch_products_page(limit: int, after: Optional[str] = None, category: Optional[str] = None, specification: Optional[str] = None, section: str = "technical") -> list:
+    """Keyset page of product summaries ordered by asin, starting after `after`."""
+    query = _product_summaries(category, specification, section)
+    if after:
+        query = query.where(Product.asin > after)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query.limit(limit))).all()
+        return jsonable_encoder([dict(row._mapping) for row in rows])
+
+async def stream_products(after: Optional[str] = None, limit: Optional[int] = None, category: Optional[str] = None, specification: Optional[str] = None, section: str = "technical", batch_size: int = 500) -> AsyncIterator[dict]:
+    """Iterate the matching product summaries over a server-side cursor, batch_size rows at a time."""
+    query = _product_summaries(category, specification, section)
+    if after:
+        query = query.where(Product.asin > after)
+    if limit:
+        query = query.limit(limit)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield jsonable_encoder(dict(row._mapping))
+
+
+@with_retry
+async def fetch_latest_html_by_asin(asin: str) -> Optional[bytes]:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(HtmlArchive.html)
+            .join(ProductPage, ProductPage.content_hash == HtmlArchive.content_hash)
+            .where(ProductPage.asin == asin)
+            .order_by(ProductPage.fetched_at.desc())
+            .limit(1)
+        )
+
+@with_retry
+async def fetch_archived_asins() -> List[str]:
+    async with AsyncSessionLocal() as db:
+        return list(await db.scalars(select(ProductPage.asin).distinct()))
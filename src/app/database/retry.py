@@ -0,0 +1,58 @@
+"""
+One retry policy for every read/create helper.
+
+A pooled connection can be dropped by the server or a proxy between uses
+("SSL SYSCALL error: EOF detected", "server closed the connection
+unexpectedly"). pool_pre_ping catches most of these at checkout; the rest
+surface mid-statement and are retried here on a fresh connection, with
+exponential backoff. Each helper runs in its own session, so retrying the
+whole call is safe.
+"""
+import asyncio
+import functools
+import inspect
+import time
+from typing import Callable
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from ...config.main import settings
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (OperationalError, InterfaceError))
+
+
+def _delay(attempt: int) -> float:
+    return settings.DB_RETRY_BACKOFF * 2 ** attempt
+
+
+def with_retry(fn: Callable) -> Callable:
+    attempts = settings.DB_RETRY_ATTEMPTS
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    if attempt == attempts - 1 or not is_retryable(e):
+                        raise
+                    print(f"Retrying {fn.__name__} after database error ({attempt + 1}/{attempts}): {e}")
+                    await asyncio.sleep(_delay(attempt))
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == attempts - 1 or not is_retryable(e):
+                    raise
+                print(f"Retrying {fn.__name__} after database error ({attempt + 1}/{attempts}): {e}")
+                time.sleep(_delay(attempt))
+    return wrapper
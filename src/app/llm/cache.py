@@ -0,0 +1,184 @@
+"""
+Persistent LLM response cache shared by every chain.
+
+Installed as the langchain global cache, so every model handle of the
+registry in config/llm.py looks up responses here before calling the
+provider. Entries are keyed by a hash of the model configuration langchain
+serialises (model, temperature, ...) and the messages, and are stored in a
+local SQLite file so they survive restarts and are shared by the uvicorn
+workers on a host.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from ...config.main import settings
+
+
+def _tokens(generations: Sequence[Any]) -> int:
+    # chat generations carry the provider's usage on their message
+    total = 0
+    for generation in generations:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        total += usage.get("total_tokens", 0)
+    return total
+
+
+def _dump(generations: Sequence[Generation]) -> str:
+    # plain message dicts rather than langchain's serializer, which changes between versions
+    return json.dumps([
+        {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+        if isinstance(generation, ChatGeneration)
+        else {"text": generation.text, "generation_info": generation.generation_info}
+        for generation in generations
+    ])
+
+
+def _load(value: str) -> RETURN_VAL_TYPE:
+    return [
+        ChatGeneration(message=messages_from_dict([entry["message"]])[0], generation_info=entry["generation_info"])
+        if "message" in entry
+        else Generation(text=entry["text"], generation_info=entry["generation_info"])
+        for entry in json.loads(value)
+    ]
+
+
+class PersistentLLMCache(BaseCache):
+    """SQLite backed langchain cache with a TTL and least-recently-hit eviction above max_bytes."""
+
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_hit_at ON llm_cache (last_hit_at)")
+        # running size of the table, so writes under budget need no scan; other
+        # workers write the same file, so it is re-read before anything is evicted
+        self._bytes = self._size()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, tokens, created_at, size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._bytes -= row[3]
+                self.expirations += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE llm_cache SET last_hit_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self.tokens_saved += row[1]
+        return _load(row[0])
+
+    def contains(self, prompt: str, llm_string: str) -> bool:
+        """A fresh entry exists, without counting a lookup."""
+        with self._lock:
+            row = self._db.execute("SELECT created_at FROM llm_cache WHERE key = ?", (self._key(prompt, llm_string),)).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = _dump(return_val)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, tokens, created_at, last_hit_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), value, len(value), _tokens(return_val), now, now),
+            )
+            # a replaced entry is counted twice until the next re-read, which only evicts sooner
+            self._bytes += len(value)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _size(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def _evict(self):
+        size = self._bytes = self._size()
+        if size <= self.max_bytes:
+            return
+        # drop the least recently hit entries down to 90% of the budget, so the
+        # writes that follow do not each land over it and re-read the size
+        target = self.max_bytes * 0.9
+        for key, entry_size in self._db.execute("SELECT key, size FROM llm_cache ORDER BY last_hit_at").fetchall():
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self.evictions += 1
+            size -= entry_size
+            if size <= target:
+                break
+        self._bytes = size
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM llm_cache")
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def install_llm_cache() -> Optional[PersistentLLMCache]:
+    """Set the persistent cache as langchain's global cache, once per process."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    cache = get_llm_cache()
+    if not isinstance(cache, PersistentLLMCache):
+        cache = PersistentLLMCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_TTL_SECONDS, settings.LLM_CACHE_MAX_BYTES)
+        set_llm_cache(cache)
+    return cache
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    cache = get_llm_cache()
+    return cache.stats() if isinstance(cache, PersistentLLMCache) else {"enabled": False}
@@ -0,0 +1,228 @@
+"""
+Recovery of structured output from LLM responses.
+
+Chains hand the raw response text to `parse_output` instead of a strict
+parser. It tries, in order:
+- the text as is,
+- the JSON value inside it, with code fences and surrounding prose removed,
+  trailing commas dropped and truncated strings and brackets closed,
+- the same with values coerced to the schema's types (a list where a
+  comma-separated string is expected, a single object where a list is, ...),
+- a last resort call asking a small model to fix the JSON.
+Only when all of them fail is an OutputParserException raised, the same
+error PydanticOutputParser raises. Outcomes are counted per chain.
+"""
+import json
+import re
+from inspect import isclass
+from threading import Lock
+from typing import Any, Dict, Optional, Type, TypeVar, Union, get_args, get_origin
+
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel, ValidationError
+
+from ...config.llm import models
+
+T = TypeVar("T", bound=BaseModel)
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+
+FIX_PROMPT = """The following text was meant to be a single JSON value{schema_hint}.
+Return it as valid JSON, keeping all of its content. Respond with JSON only.
+
+{schema}
+Text:
+{content}"""
+
+
+class OutputStats:
+    """Per chain: responses parsed as is, repaired locally, fixed by a second call, or failed."""
+
+    OUTCOMES = ("parsed", "repaired", "fixed", "failed")
+
+    def __init__(self):
+        self._lock = Lock()
+        self.chains: Dict[str, Dict[str, int]] = {}
+
+    def record(self, chain: str, outcome: str):
+        with self._lock:
+            counts = self.chains.setdefault(chain, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for chain, counts in self.chains.items():
+            total = sum(counts.values())
+            result[chain] = {
+                **counts,
+                "parse_failure_rate": round((total - counts["parsed"]) / total, 4),
+                "repair_rate": round((counts["repaired"] + counts["fixed"]) / total, 4),
+            }
+        return result
+
+
+output_stats = OutputStats()
+
+
+def extract_json(content: str) -> str:
+    """The JSON value in a response, without code fences or the prose around it."""
+    fenced = FENCE.search(content)
+    if fenced:
+        content = fenced.group(1)
+    starts = [index for index in (content.find("{"), content.find("[")) if index != -1]
+    return content[min(starts):] if starts else content.strip()
+
+
+def _drop_trailing_comma(out: list):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str) -> str:
+    """
+    Drop trailing commas and anything after the top-level value, escape raw
+    newlines in strings, and close a truncated string and open brackets.
+    """
+    out = []
+    closers = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                char = "\\n"
+            out.append(char)
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            _drop_trailing_comma(out)
+            if not closers or closers[-1] != char:
+                # a stray closer, keep going and let the stack decide
+                continue
+            closers.pop()
+            out.append(char)
+            if not closers:
+                break
+            continue
+        out.append(char)
+
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    _drop_trailing_comma(out)
+    if out and out[-1] == ":":
+        out.append("null")
+    while closers:
+        _drop_trailing_comma(out)
+        out.append(closers.pop())
+    return "".join(out)
+
+
+def _coerce_value(value: Any, annotation: Any) -> Any:
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Union:
+        if value is None:
+            return None
+        options = [arg for arg in args if arg is not type(None)]
+        return _coerce_value(value, options[0]) if len(options) == 1 else value
+    if annotation is str:
+        if isinstance(value, list):
+            return ", ".join(str(item) for item in value if item is not None)
+        if isinstance(value, dict):
+            return json.dumps(value)
+        if isinstance(value, (int, float, bool)):
+            return str(value)
+        return value
+    if origin is list:
+        items = value if isinstance(value, list) else [value]
+        return [_coerce_value(item, args[0]) for item in items] if args else items
+    if origin is dict and isinstance(value, dict) and len(args) == 2:
+        return {key: _coerce_value(item, args[1]) for key, item in value.items()}
+    if isclass(annotation) and issubclass(annotation, BaseModel):
+        return coerce(value, annotation)
+    return value
+
+
+def coerce(data: Any, schema: Type[BaseModel]) -> Any:
+    """Reshape parsed JSON towards the schema; pydantic validates the result."""
+    fields = schema.model_fields
+    if isinstance(data, list) and len(fields) == 1:
+        # a bare list for a schema wrapping one list, e.g. {"improvements": [...]}
+        data = {next(iter(fields)): data}
+    if not isinstance(data, dict):
+        return data
+    if not set(fields) & set(data) and isinstance(data.get("properties"), dict):
+        # the values were nested under the schema's "properties", as in the format instructions
+        data = data["properties"]
+    names = {name.lower(): name for name in fields}
+    result = {}
+    for key, value in data.items():
+        name = names.get(str(key).lower(), key)
+        result[name] = _coerce_value(value, fields[name].annotation) if name in fields else value
+    return result
+
+
+def _parse(content: str, schema: Optional[Type[T]], lenient: bool = True) -> Union[T, Any]:
+    data = json.loads(content)
+    if schema is None:
+        return data
+    return schema.model_validate(coerce(data, schema) if lenient else data)
+
+
+def _recover(content: str, schema: Optional[Type[T]]) -> Union[T, Any]:
+    extracted = extract_json(content)
+    try:
+        return _parse(extracted, schema)
+    except (ValueError, ValidationError):
+        return _parse(repair_json(extracted), schema)
+
+
+async def _fix(content: str, schema: Optional[Type[BaseModel]]) -> str:
+    prompt = FIX_PROMPT.format(
+        schema_hint=" matching the JSON schema below" if schema else "",
+        schema=f"Schema:\n{json.dumps(schema.model_json_schema())}\n" if schema else "",
+        content=content,
+    )
+    return (await models.route("output-repair").ainvoke(prompt)).content
+
+
+async def parse_output(chain: str, content: str, schema: Optional[Type[T]] = None, fix: bool = True) -> Union[T, Any]:
+    """
+    The schema instance (or plain JSON without a schema) in a response. Pass
+    fix=False where the chain has its own fallback for unparseable output.
+    """
+    try:
+        result = _parse(content, schema, lenient=False)
+        output_stats.record(chain, "parsed")
+        return result
+    except (ValueError, ValidationError):
+        pass
+
+    try:
+        result = _recover(content, schema)
+        output_stats.record(chain, "repaired")
+        return result
+    except (ValueError, ValidationError) as e:
+        error = e
+
+    if fix:
+        try:
+            result = _recover(await _fix(content, schema), schema)
+            output_stats.record(chain, "fixed")
+            return result
+        except Exception as e:
+            error = e
+
+    output_stats.record(chain, "failed")
+    raise OutputParserException(f"Failed to parse {chain} output: {error}", llm_output=content)
@@ -0,0 +1,246 @@
+"""
+Process-wide scheduler for LLM calls.
+
+Every model call goes through `ainvoke(llm, input)`; chains call a route
+from config/llm.py, which uses it for each candidate model. Calls are
+grouped into lanes per (provider, model). Each lane has:
+- a semaphore for concurrent requests,
+- token buckets for requests and tokens per minute,
+- a pause that every caller honours after a 429.
+Rate limits and transient provider errors are retried with jittered
+exponential backoff, or after the provider's Retry-After when it sends one.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from langchain_core.globals import get_llm_cache
+from langchain_core.load import dumps
+
+from ...config.main import settings
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class ProviderLimits:
+    concurrency: int
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+# limits apply per model, both providers rate limit each model separately
+PROVIDER_LIMITS: Dict[str, ProviderLimits] = {
+    "openai": ProviderLimits(settings.LLM_OPENAI_CONCURRENCY, settings.LLM_OPENAI_RPM, settings.LLM_OPENAI_TPM),
+    "groq": ProviderLimits(settings.LLM_GROQ_CONCURRENCY, settings.LLM_GROQ_RPM, settings.LLM_GROQ_TPM),
+}
+
+# langchain's _llm_type -> provider
+LLM_TYPES = {"openai-chat": "openai", "groq-chat": "groq"}
+
+
+def estimate_tokens(value: Any) -> int:
+    # ~4 characters per token, plus room for the completion
+    return len(str(value)) // 4 + settings.LLM_COMPLETION_TOKENS_ESTIMATE
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute; may go negative when usage is reconciled."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: int):
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.level >= amount:
+                self.level -= amount
+                return
+            await asyncio.sleep((amount - self.level) / self.rate)
+
+    def debit(self, amount: int):
+        self._refill()
+        self.level -= amount
+
+
+class Lane:
+    def __init__(self, limits: ProviderLimits):
+        self.semaphore = asyncio.Semaphore(limits.concurrency)
+        self.requests = TokenBucket(limits.requests_per_minute)
+        self.tokens = TokenBucket(limits.tokens_per_minute)
+        self.paused_until = 0.0
+        self.queued = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def wait_for_pause(self):
+        delay = self.paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.paused_until - time.monotonic()
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "avg_wait_ms": round(self.wait_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # an HTTP date rather than seconds, fall back to backoff
+        pass
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # connection resets and timeouts carry no status
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "TimeoutException")
+
+
+def backoff(attempt: int) -> float:
+    # full jitter so callers that failed together do not retry together
+    return random.uniform(0, min(settings.LLM_BACKOFF_MAX, settings.LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+class LLMScheduler:
+    def __init__(self, limits: Dict[str, ProviderLimits]):
+        self.limits = limits
+        self._lanes: Dict[Tuple[str, str], Lane] = {}
+
+    def lane(self, provider: str, model: str) -> Lane:
+        key = (provider, model)
+        if key not in self._lanes:
+            self._lanes[key] = Lane(self.limits.get(provider, self.limits["openai"]))
+        return self._lanes[key]
+
+    async def run(self, provider: str, model: str, call: Callable[[], Awaitable[T]], tokens: int) -> T:
+        lane = self.lane(provider, model)
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            queued_at = time.monotonic()
+            lane.queued += 1
+            dequeued = False
+            try:
+                async with lane.semaphore:
+                    await lane.wait_for_pause()
+                    await lane.requests.acquire(1)
+                    await lane.tokens.acquire(tokens)
+                    lane.queued -= 1
+                    dequeued = True
+                    waited = time.monotonic() - queued_at
+                    lane.calls += 1
+                    lane.wait_seconds += waited
+                    lane.max_wait_seconds = max(lane.max_wait_seconds, waited)
+                    lane.in_flight += 1
+                    try:
+                        result = await call()
+                    finally:
+                        lane.in_flight -= 1
+            except Exception as e:
+                if attempt == settings.LLM_MAX_RETRIES or not is_retryable(e):
+                    lane.failures += 1
+                    raise
+                retry_after = _retry_after(e)
+                if _status_code(e) == 429:
+                    lane.rate_limited += 1
+                    # every caller on the lane backs off, not just this one
+                    lane.pause(retry_after if retry_after is not None else backoff(attempt))
+                lane.retries += 1
+                print(f"Retrying {provider}/{model} after error ({attempt + 1}/{settings.LLM_MAX_RETRIES}): {e}")
+                await asyncio.sleep(retry_after if retry_after is not None else backoff(attempt))
+                continue
+            finally:
+                if not dequeued:
+                    lane.queued -= 1
+
+            usage = getattr(result, "usage_metadata", None) or {}
+            if usage.get("total_tokens"):
+                # settle the estimate against what the provider counted
+                lane.tokens.debit(usage["total_tokens"] - tokens)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {f"{provider}/{model}": lane.stats() for (provider, model), lane in self._lanes.items()}
+
+
+scheduler = LLMScheduler(PROVIDER_LIMITS)
+
+
+def _describe(llm) -> Tuple[str, str]:
+    provider = LLM_TYPES.get(getattr(llm, "_llm_type", ""), "openai")
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or "default"
+    return provider, model
+
+
+def contains_cached(llm, input: Any) -> bool:
+    """A fresh cached response exists for input, checked the way langchain will. Blocks on the cache."""
+    cache = get_llm_cache()
+    if cache is None or llm.cache is False:
+        return False
+    try:
+        prompt, llm_string = dumps(llm._convert_input(input).to_messages()), llm._get_llm_string()
+        contains = getattr(cache, "contains", None)
+        return contains(prompt, llm_string) if contains else cache.lookup(prompt, llm_string) is not None
+    except Exception:
+        return False
+
+
+async def is_cached(llm, input: Any) -> bool:
+    if get_llm_cache() is None or llm.cache is False:
+        return False
+    # the lookup hits SQLite, keep it off the event loop
+    return await asyncio.to_thread(contains_cached, llm, input)
+
+
+async def ainvoke(llm, input: Any, cached: Optional[bool] = None) -> Any:
+    """llm.ainvoke(input) scheduled on the model's lane; cached is the caller's own lookup, if it made one."""
+    if cached is None:
+        cached = await is_cached(llm, input)
+    # cached responses need no budget
+    if cached:
+        return await llm.ainvoke(input)
+    provider, model = _describe(llm)
+    return await scheduler.run(provider, model, lambda: llm.ainvoke(input), estimate_tokens(input))
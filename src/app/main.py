@@ -1,24 +1,20 @@
-from typing import Any, Dict, List
+import json
+from typing import Any, Dict, List, Optional
 
 from src.app.swot.main import Swot, SwotAnalysisConsolidated
 
-from .product_sage.web_reviewer import ReviewSchema, WebReviewer
-from bs4 import BeautifulSoup
-import httpx
-from .database.read.main import asin_exists, asin_exists_sage, fetch_product_by_asin, fetch_product_enhancements_by_asin, fetch_product_sage_by_asin, fetch_product_web_reviewer_by_asin, product_enhancements_exists, product_web_reviewer_exists, fetch_all_products
-from .database.create.main import create_product, create_product_enhancements, create_product_sage, create_product_web_reviewer
+from .product_sage.web_reviewer import ReviewSchema
+from .database.read.async_main import fetch_all_products, fetch_products_page, stream_products
 from .database.init_db import init_db
-from fastapi.responses import JSONResponse
-from .schemas.api import ProductSageResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from .schemas.api import BatchIngestRequest, ProductSageResponse
 from .schemas.product_sage import Specifications
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from dibkb_scraper import AmazonScraper
-from dibkb_scraper.playwright import PlaywrightScraper
+from .scraper.batch import ingest_batch
+from .services import product_service
 
-from .product_sage.main import ProductSage
 import socketio
-from .product_enhancer.enhance import ProductEnhancer
 import os
 import dotenv
 from ..config.main import settings
@@ -44,6 +40,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 sio_app = socketio.ASGIApp(sio, app)
@@ -53,12 +50,14 @@ sio_app = socketio.ASGIApp(sio, app)
 async def startup_db_client():
     try:
         init_db()
-        global chrome_scraper
-        chrome_scraper = PlaywrightScraper()
-        await chrome_scraper.initialize()
+        await product_service.initialize()
     except Exception as e:
         print(f"Failed to initialize database: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_product_service():
+    await product_service.shutdown()
+
 # socket io events
 @sio.event
 async def connect(sid, environ):
@@ -74,116 +73,109 @@ async def health_check():
     return {"status": "Healthy running 🚀"}
 
 @app.get("/products")
-async def get_products():
+async def get_products(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = None,
+    stream: bool = False,
+    category: Optional[str] = None,
+    specification: Optional[str] = None,
+    section: str = Query("technical", pattern="^(technical|additional)$"),
+):
+    if stream:
+        async def ndjson():
+            async for product in stream_products(after, limit, category, specification, section):
+                yield json.dumps(product) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
     try:
-        products = fetch_all_products()
-        return products
+        if limit is None and not (category or specification):
+            return await fetch_all_products()
+
+        limit = limit or 100
+        products = await fetch_products_page(limit, after, category, specification, section)
+        headers = {"X-Next-Cursor": products[-1]["asin"]} if len(products) == limit else {}
+        return JSONResponse(content=products, headers=headers)
     except Exception as e:
         print(f"Error getting products: {e}")
         return []
 
+@app.get("/stats")
+async def get_stats():
+    return product_service.stats()
+
 @app.get("/latest-update")
 async def latest_update():
     return {"status": "Scraper updated to version 0.2.9 (fake headers added)"}
 
 @app.get("/amazon/{asin}",response_model=Dict[str,Any])
 async def get_amazon_product(asin: str)->Dict[str,Any]:
-    if not asin_exists(asin):
-        try:
-            html = await chrome_scraper.get_html_content(f"https://www.amazon.in/dp/{asin}")
-            soup = BeautifulSoup(html, "html.parser")
-            scraper = AmazonScraper(asin,soup)
-            product = scraper.get_all_details()
-            if product['product'] is None:
-                raise Exception("Product not found")
-            
-            result = product['product']
-            if result['title'] == None or result['title'] == "":
-                raise Exception("Product title not found")
-            if result['price'] == None or result['price'] == "":
-                raise Exception("Product price not found")
-            response = create_product(result,asin)
-            return response
-        except Exception as e:
-            print(f"Error getting product: {e}")
-            return JSONResponse(status_code=404, content={"message": str(e)})
-    else:
-        product = fetch_product_by_asin(asin)
-        return product
+    try:
+        return await product_service.get_product_with_reviews(asin)
+    except Exception as e:
+        print(f"Error getting product: {e}")
+        return JSONResponse(status_code=404, content={"message": str(e)})
 
-@app.get("/amazon/product-sage/{asin}",response_model=Any)
-async def get_amazon_product_sage(asin: str)->Any:
-    if not asin_exists_sage(asin):
-        try:
-            client = httpx.AsyncClient()
-            response = await client.get(f"{settings.BACKEND_URL}/amazon/{asin}")
-            product_detials = response.json()
+async def emit_batch_progress(sid: str, asins: List[str]):
+    summary: Dict[str, int] = {}
+    async for event in ingest_batch(asins, product_service.scrape_missing_product, write=product_service.write_scraped_products):
+        summary[event["status"]] = summary.get(event["status"], 0) + 1
+        await sio.emit("batch_progress", event, room=sid)
+    await sio.emit("batch_complete", summary, room=sid)
 
-            product_info = product_detials['specifications']
-            reviews: List[str] = product_detials['reviews']
-    
+@app.post("/amazon/batch")
+async def ingest_amazon_products(request: BatchIngestRequest):
+    if len(request.asins) > settings.BATCH_MAX_ASINS:
+        return JSONResponse(status_code=413, content={"message": f"At most {settings.BATCH_MAX_ASINS} asins per batch"})
 
-            product_sage = ProductSage(product_info, reviews)
-            sentiments = product_sage.get_analysis()
-            improvements = product_sage.get_product_improvement()
+    if request.sid:
+        sio.start_background_task(emit_batch_progress, request.sid, request.asins)
+        return JSONResponse(status_code=202, content={"status": "accepted", "sid": request.sid})
 
-            response = create_product_sage(improvements,sentiments,asin)
+    async def ndjson():
+        async for event in ingest_batch(request.asins, product_service.scrape_missing_product, write=product_service.write_scraped_products):
+            yield json.dumps(event) + "\n"
 
-            return response
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
-        except Exception as e:
-            print(f"Error getting product sage: {e}")
-            return []
+async def emit_sage_progress(sid: str, asin: str):
+    async def emit_sentiment(index: int, sentiment):
+        await sio.emit("sage_sentiment", {"asin": asin, "index": index, "sentiment": sentiment.model_dump()}, room=sid)
 
-    else:
-        product = fetch_product_sage_by_asin(asin)
-        return product
+    try:
+        sage = await product_service.stream_sage(asin, emit_sentiment)
+        await sio.emit("sage_improvements", {"asin": asin, "improvements": sage["improvements"], "weights": sage.get("weights"), "review_indexes": sage.get("review_indexes")}, room=sid)
+    except Exception as e:
+        print(f"Error streaming product sage: {e}")
+        await sio.emit("sage_error", {"asin": asin, "message": str(e)}, room=sid)
+
+@app.get("/amazon/product-sage/{asin}",response_model=Any)
+async def get_amazon_product_sage(asin: str, sid: Optional[str] = None)->Any:
+    if sid:
+        sio.start_background_task(emit_sage_progress, sid, asin)
+        return JSONResponse(status_code=202, content={"status": "accepted", "sid": sid})
+
+    try:
+        return await product_service.get_sage(asin)
+    except Exception as e:
+        print(f"Error getting product sage: {e}")
+        return []
 
 @app.get("/amazon/product-sage/web-reviewer/{asin}", response_model=List[ReviewSchema])
 async def get_amazon_product_sage_web_reviewer(asin: str) -> List[ReviewSchema]:
-    if not product_web_reviewer_exists(asin):
-        try:
-            client = httpx.AsyncClient()
-            response = await client.get(f"{settings.BACKEND_URL}/amazon/{asin}")
-            product = response.json()
-            title = product['title']
-            reviewer = WebReviewer(title)
-            reviews = reviewer.get_top_website_content()
-            response = create_product_web_reviewer(reviews, asin)
-            return response
-        except Exception as e:
-            print(f"Error getting product sage web reviewer: {e}")
-            return []
-    else:
-        reviews = fetch_product_web_reviewer_by_asin(asin)
-        return [ReviewSchema(**review) for review in reviews['reviews']]
+    try:
+        return await product_service.get_web_reviews(asin)
+    except Exception as e:
+        print(f"Error getting product sage web reviewer: {e}")
+        return []
 
 
 @app.get("/amazon/product-enhancements/{asin}")
 async def get_amazon_competitors(asin: str):
-    if not product_enhancements_exists(asin):
-        try:
-            client = httpx.AsyncClient()
-            response = await client.get(f"{settings.BACKEND_URL}/amazon/{asin}")
-            product = response.json()
-            product_enhancer = ProductEnhancer(product)
-            content = product_enhancer.generate_enhanced_listing()
-            response = create_product_enhancements(content,asin)
-
-            return {
-                "asin": asin,
-                "enhancements": content
-            }
-        
-        except Exception as e:
-            print(f"Error generating product enhancements: {e}")
-            return {"error": "Failed to generate product enhancements"}
-        finally:
-            await client.aclose()
-
-    else:
-        product = fetch_product_enhancements_by_asin(asin)
-        return product
+    try:
+        return await product_service.get_enhancements(asin)
+    except Exception as e:
+        print(f"Error generating product enhancements: {e}")
+        return {"error": "Failed to generate product enhancements"}
 
 @app.get("/amazon/swot-consolidated/{asin}",response_model=SwotAnalysisConsolidated)
 async def get_amazon_swot(asin: str,competitors: str):
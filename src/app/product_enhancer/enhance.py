@@ -1,20 +1,21 @@
-import json
 from typing import Dict, Any
+from langchain_core.exceptions import OutputParserException
 from langchain_core.messages import SystemMessage, HumanMessage
 from .web_search import TopWebsiteSearch
-from ...config.llm import AIModels
+from ...config.llm import models
+from ..llm.output import parse_output
 class ProductEnhancer:
     def __init__(self,product_data: Dict[str, Any]):
-        self.llm = AIModels().llama_4_mavrick()
+        self.llm = models.route("llama-4-maverick")
         self.web_search = TopWebsiteSearch(product_data['title'])
         self.title = product_data['title']
         self.highlights = product_data['description']['highlights']
         self.technical = product_data['specifications']['technical']
         self.additional = product_data['specifications']['additional']
 
-    def generate_enhanced_listing(self) -> Dict[str, Any]:
+    async def generate_enhanced_listing(self) -> Dict[str, Any]:
         # Get additional info from web search
-        web_info = self.web_search.get_top_website_content()
+        web_info = await self.web_search.get_top_website_content()
         
         prompt = f"""
         You are a professional Amazon listing optimizer tasked with enhancing product listings.
@@ -63,27 +64,12 @@ class ProductEnhancer:
             HumanMessage(content=prompt)
         ]
         
-        response = self.llm.invoke(messages)
+        response = await self.llm.ainvoke(messages)
         
-        # Clean and parse the response
         try:
-            content = response.content
+            return await parse_output("enhancement", response.content)
             
-            # Remove any markdown code block markers
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0].strip()
-            elif '```' in content:
-                content = content.split('```')[1].split('```')[0].strip()
-                
-            # Find and extract just the JSON part if there's explanation text
-            if '{' in content and '}' in content:
-                start_idx = content.find('{')
-                end_idx = content.rfind('}') + 1
-                content = content[start_idx:end_idx]
-                
-            return json.loads(content)
-            
-        except json.JSONDecodeError as e:
+        except OutputParserException as e:
             print(f"JSON decode error: {e}")
             # Return a basic structure if parsing fails
             return {
@@ -2,15 +2,16 @@ import os
 from langchain_community.utilities import SerpAPIWrapper
 from typing import Dict
 import httpx
+from ..utils.replay import replayed, replay_transport
 class TopWebsiteSearch:
     def __init__(self,title):
         self.search = SerpAPIWrapper(serpapi_api_key=os.getenv("SERP_API_KEY")) 
 
         self.title = title
     
-    def get_top_website_content(self) -> Dict:
+    async def get_top_website_content(self) -> Dict:
         """Returns content from the top search result website"""
-        results = self.search.results(self.title)
+        results = await replayed("serpapi", self.title, lambda: self.search.aresults(self.title))
         
         if not results.get("organic_results"):
             return {"error": "No results found"}
@@ -24,7 +25,8 @@ class TopWebsiteSearch:
                 break
         
         try:
-            response = httpx.get(f"https://r.jina.ai/{url}", timeout=10)
+            async with httpx.AsyncClient(transport=replay_transport("jina")) as client:
+                response = await client.get(f"https://r.jina.ai/{url}", timeout=10)
             
             return {
                 "source": url,
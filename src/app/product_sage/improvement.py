@@ -2,11 +2,13 @@ from typing import List
 
 from ..schemas.product_sage import Specifications
 from .sentiment import SentimentSchema
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel
 
+from ...config.llm import models
+from ..llm.output import parse_output
+
 class ProductImprovementSchema(BaseModel):
     improvement: str 
     affected_component: str
@@ -19,11 +21,7 @@ class ProductImprovements(BaseModel):
 
 class ProductImprovement:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            temperature=0.1,
-            model="gpt-4o-mini",
-            model_kwargs={"response_format": {"type": "json_object"}}
-        )
+        self.llm = models.route("product-improvement")
         self.parser = PydanticOutputParser(pydantic_object=ProductImprovements)
         self.prompt = PromptTemplate(
             template="""You are a product development expert. Analyze the provided product information and customer feedback to suggest technical improvements.
@@ -57,14 +55,14 @@ class ProductImprovement:
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
         
-    def generate_improvements(self, product_info: Specifications, analysis: List[SentimentSchema]) -> List[ProductImprovementSchema]:
+    async def generate_improvements(self, product_info: Specifications, analysis: List[SentimentSchema]) -> List[ProductImprovementSchema]:
         try:
             # Format the analysis list into a more readable string format
             formatted_analysis = "\n".join([
                 f"Review {i+1}:\n"
                 f"- Sentiment: {review.sentiment}\n"
-                f"- Features: {', '.join(review.features)}\n"
-                f"- Key Aspects: {', '.join(review.key_aspects)}\n"
+                f"- Features: {review.features}\n"
+                f"- Key Aspects: {review.key_aspects}\n"
                 for i, review in enumerate(analysis)
             ])
             
@@ -72,8 +70,8 @@ class ProductImprovement:
                 product_info=product_info, 
                 analysis=formatted_analysis
             )
-            response = self.llm.invoke(formatted_prompt)
-            parsed_response: ProductImprovements = self.parser.parse(response.content)
+            response = await self.llm.ainvoke(formatted_prompt)
+            parsed_response: ProductImprovements = await parse_output("improvement", response.content, ProductImprovements)
             return parsed_response.improvements
         
         except Exception as e:
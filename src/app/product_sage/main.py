@@ -1,64 +1,81 @@
-from typing import List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, List, Optional, Tuple
 
-from .translation import Translation
+from .translation import TranslationSchema
 from typing import Dict,Any
 from .improvement import ProductImprovement
-from .sentiment import SentimentAnalysis, SentimentSchema
+from .preprocess import SampledReview, SelectionStats
+from .review_analysis import BatchReviewAnalyzer
+from .sentiment import SentimentSchema
 
 
 class ProductSage:
-    def __init__(self, product_info: Dict[str,Any], reviews: List[str]):
+    def __init__(self, product_info: Dict[str,Any], sample: List[SampledReview], selection: SelectionStats, analyzed: Optional[Dict[str, Tuple[TranslationSchema, SentimentSchema]]] = None):
         self.product_improvement = ProductImprovement()
-        self.translation = Translation()
-        self.sentiment_analysis = SentimentAnalysis()
+        self.review_analyzer = BatchReviewAnalyzer()
         self.product_info = product_info
-        self.reviews = reviews
+        # review text -> (translation, sentiment) already stored for it, those reviews skip the llm
+        self.analyzed = analyzed or {}
+        # the reviews left by select_reviews; results below follow self.sample, not the scraped reviews
+        self.sample, self.selection = sample, selection
+        self.reviews = [review.text for review in self.sample]
+        self.weights = [review.weight for review in self.sample]
+        self.review_indexes = [review.index for review in self.sample]
         self.translated_reviews = []
         self.sentiment_analysis_results = []
-        self.max_workers = min(32, len(reviews))
-        self._reviews_translated = False
-        self._sentiment_analyzed = False
+        self._reviews_analyzed = False
 
+    async def analyze_reviews(self):
+        # translation and sentiment come from the same batched calls
+        if not self._reviews_analyzed:
+            pending = list(dict.fromkeys(review for review in self.reviews if review not in self.analyzed))
+            analyzed = {**self.analyzed, **dict(zip(pending, await self.review_analyzer.analyze(pending)))}
+            self.translated_reviews = [analyzed[review][0] for review in self.reviews]
+            self.sentiment_analysis_results = [analyzed[review][1] for review in self.reviews]
+            self._reviews_analyzed = True
 
-    def translate_reviews(self) -> List[str]:
-        if not self._reviews_translated:
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_review = {
-                    executor.submit(self.translation.translate, review): review 
-                    for review in self.reviews
-                }
-                self.translated_reviews = [
-                    future.result() 
-                    for future in as_completed(future_to_review)
-                ]
-            self._reviews_translated = True
+    async def stream_analysis(self) -> AsyncIterator[Tuple[int, TranslationSchema, SentimentSchema]]:
+        """
+        (index, translation, sentiment) per review as each one finishes. Stored
+        analyses come first; every other review is translated and analysed on
+        its own instead of waiting for its batch.
+        """
+        if self._reviews_analyzed:
+            for index, review in enumerate(self.reviews):
+                yield index, self.translated_reviews[index], self.sentiment_analysis_results[index]
+            return
+
+        analyzed = dict(self.analyzed)
+        positions: Dict[str, List[int]] = {}
+        for index, review in enumerate(self.reviews):
+            if review in analyzed:
+                yield index, *analyzed[review]
+            else:
+                positions.setdefault(review, []).append(index)
+
+        pending = list(positions)
+        async for position, result in self.review_analyzer.analyze_each(pending):
+            analyzed[pending[position]] = result
+            for index in positions[pending[position]]:
+                yield index, *result
+
+        self.translated_reviews = [analyzed[review][0] for review in self.reviews]
+        self.sentiment_analysis_results = [analyzed[review][1] for review in self.reviews]
+        self._reviews_analyzed = True
+
+    async def translate_reviews(self) -> List[TranslationSchema]:
+        await self.analyze_reviews()
         return self.translated_reviews
 
-    def analyze_sentiment(self) -> List[SentimentSchema]:
-        self.translate_reviews()  # Ensure reviews are translated first
-    
-        if not self._sentiment_analyzed:
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_review = {
-                    executor.submit(self.sentiment_analysis.analyze, review): review 
-                    for review in self.translated_reviews
-                }
-                self.sentiment_analysis_results = [
-                    future.result() 
-                    for future in as_completed(future_to_review)
-                ]
-            self._sentiment_analyzed = True
+    async def analyze_sentiment(self) -> List[SentimentSchema]:
+        await self.analyze_reviews()
         return self.sentiment_analysis_results
     
-    def get_analysis(self) -> List[SentimentSchema]:
-        return self.analyze_sentiment()
+    async def get_analysis(self) -> List[SentimentSchema]:
+        return await self.analyze_sentiment()
     
-    def get_product_improvement(self):
-        self.analyze_sentiment() 
-        return self.product_improvement.generate_improvements(
+    async def get_product_improvement(self):
+        await self.analyze_sentiment()
+        return await self.product_improvement.generate_improvements(
             self.product_info, 
             self.sentiment_analysis_results
         )
-
-
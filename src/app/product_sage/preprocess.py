@@ -0,0 +1,203 @@
+"""
+Review selection before LLM analysis.
+
+Reviews are normalised, exact and near duplicates (MinHash over character
+shingles, banded LSH for candidates) are collapsed into one representative,
+and when more representatives remain than SAGE_MAX_REVIEWS a stratified
+sample is taken. Every selected review carries the number of scraped
+reviews it stands for, so a weighted sentiment mix stays representative of
+the whole page.
+"""
+import asyncio
+import hashlib
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ...config.main import settings
+from ..scraper.parse import get_parse_executor
+from .translation import detect_language
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 4
+BAND_ROWS = 4
+
+# word counts splitting short, medium and long reviews
+LENGTH_BUCKETS = (5, 30)
+
+NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+@dataclass
+class SampledReview:
+    index: int  # position in the input reviews
+    text: str
+    weight: float  # scraped reviews this one stands for
+
+
+def normalize(text: str) -> str:
+    return NON_WORD.sub(" ", unicodedata.normalize("NFKC", text).lower()).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    if len(text) <= size:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)}
+
+
+def _permutations(count: int) -> List[Tuple[int, int]]:
+    # fixed seeds so signatures, and therefore the selection, are stable across processes
+    return [
+        (
+            int.from_bytes(hashlib.sha256(f"a{i}".encode()).digest()[:8], "big") % MERSENNE_PRIME | 1,
+            int.from_bytes(hashlib.sha256(f"b{i}".encode()).digest()[:8], "big") % MERSENNE_PRIME,
+        )
+        for i in range(count)
+    ]
+
+
+PERMUTATIONS = _permutations(settings.SAGE_MINHASH_PERMUTATIONS)
+
+
+def minhash(values: Iterable[int]) -> Tuple[int, ...]:
+    values = list(values)
+    return tuple(min((a * value + b) % MERSENNE_PRIME for value in values) for a, b in PERMUTATIONS)
+
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class _Clusters:
+    """Union-find over review positions."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first: int, second: int):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def _stratum(text: str) -> Tuple[int, str]:
+    # scraped reviews carry no star rating, so length and language stand in for it
+    words = len(text.split())
+    length = sum(words > bound for bound in LENGTH_BUCKETS)
+    language, _ = detect_language(text)
+    return length, "en" if language == "en" else "other"
+
+
+def _allocate(sizes: Dict[Tuple[int, str], int], budget: int) -> Dict[Tuple[int, str], int]:
+    """Split the budget across strata in proportion to their size, largest remainder first."""
+    total = sum(sizes.values())
+    shares = {stratum: budget * size / total for stratum, size in sizes.items()}
+    allocation = {stratum: min(sizes[stratum], max(1, int(share))) for stratum, share in shares.items()}
+    by_remainder = sorted(shares, key=lambda stratum: shares[stratum] - int(shares[stratum]), reverse=True)
+    while sum(allocation.values()) < budget:
+        open_strata = [stratum for stratum in by_remainder if allocation[stratum] < sizes[stratum]]
+        if not open_strata:
+            break
+        allocation[open_strata[0]] += 1
+        by_remainder.remove(open_strata[0])
+        by_remainder.append(open_strata[0])
+    while sum(allocation.values()) > budget:
+        # the one-per-stratum floor overshot a small budget, trim the biggest strata
+        largest = max(allocation, key=lambda stratum: allocation[stratum])
+        allocation[largest] -= 1
+    return allocation
+
+
+@dataclass
+class SelectionStats:
+    reviews: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    sampled_out: int = 0
+
+
+def select_reviews(
+    reviews: List[str],
+    preferred: Optional[Set[str]] = None,
+    budget: int = settings.SAGE_MAX_REVIEWS,
+    threshold: float = settings.SAGE_DEDUPE_THRESHOLD,
+) -> Tuple[List[SampledReview], SelectionStats]:
+    """
+    The reviews worth analysing, in input order, and what was dropped. Within
+    a duplicate cluster a review in `preferred` (e.g. already analysed) is
+    chosen as the representative; the sample itself ignores it, so new
+    reviews get their fair share of the budget.
+    """
+    preferred = preferred or set()
+    stats = SelectionStats(reviews=len(reviews))
+
+    # exact duplicates after normalisation
+    first_seen: Dict[str, int] = {}
+    members: Dict[int, List[int]] = {}
+    for index, review in enumerate(reviews):
+        key = normalize(review)
+        if key in first_seen:
+            members[first_seen[key]].append(index)
+            stats.exact_duplicates += 1
+        else:
+            first_seen[key] = index
+            members[index] = [index]
+
+    # near duplicates: reviews sharing a band are candidates, kept if similar enough
+    unique = list(members)
+    signatures = [minhash(shingles(normalize(reviews[index]))) for index in unique]
+    clusters = _Clusters(len(unique))
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for position, signature in enumerate(signatures):
+        for band in range(0, len(signature), BAND_ROWS):
+            buckets.setdefault((band, signature[band:band + BAND_ROWS]), []).append(position)
+    for candidates in buckets.values():
+        for other in candidates[1:]:
+            if clusters.find(other) != clusters.find(candidates[0]) and similarity(signatures[candidates[0]], signatures[other]) >= threshold:
+                clusters.union(candidates[0], other)
+
+    groups: Dict[int, List[int]] = {}
+    for position, index in enumerate(unique):
+        groups.setdefault(clusters.find(position), []).extend(members[index])
+    stats.near_duplicates = len(unique) - len(groups)
+
+    representatives: List[Tuple[int, int]] = []
+    for group in groups.values():
+        group.sort()
+        chosen = next((index for index in group if reviews[index] in preferred), group[0])
+        representatives.append((chosen, len(group)))
+
+    if len(representatives) <= budget:
+        return [SampledReview(index, reviews[index], size) for index, size in sorted(representatives)], stats
+
+    strata: Dict[Tuple[int, str], List[Tuple[int, int]]] = {}
+    for representative in representatives:
+        strata.setdefault(_stratum(reviews[representative[0]]), []).append(representative)
+    allocation = _allocate({stratum: len(items) for stratum, items in strata.items()}, budget)
+
+    selected: List[SampledReview] = []
+    for stratum, items in strata.items():
+        # ordered by content hash: stable across re-scrapes, unrelated to page position
+        items.sort(key=lambda item: hashlib.sha256(reviews[item[0]].encode("utf-8")).hexdigest())
+        kept = items[:allocation[stratum]]
+        if not kept:
+            continue
+        scale = sum(size for _, size in items) / sum(size for _, size in kept)
+        selected.extend(SampledReview(index, reviews[index], size * scale) for index, size in kept)
+    stats.sampled_out = len(representatives) - len(selected)
+    return sorted(selected, key=lambda review: review.index), stats
+
+
+async def select_reviews_async(reviews: List[str], preferred: Optional[Set[str]] = None) -> Tuple[List[SampledReview], SelectionStats]:
+    # MinHash over a few hundred reviews is pure python CPU work, keep it off the loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_executor(), select_reviews, reviews, preferred)
@@ -0,0 +1,155 @@
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+from pydantic import BaseModel
+
+from ...config.llm import models
+from ...config.main import settings
+from ..llm.output import parse_output
+from .sentiment import SentimentAnalysis, SentimentSchema
+from .translation import Translation, TranslationSchema, is_confidently_english
+
+
+class ReviewAnalysisSchema(BaseModel):
+    id: int
+    language: str
+    translation: Optional[str] = None
+    sentiment: str
+    features: str
+    key_aspects: str
+
+
+class ReviewAnalyses(BaseModel):
+    reviews: List[ReviewAnalysisSchema]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English, close enough to size a chunk
+    return len(text) // 4 + 1
+
+
+def chunk_reviews(reviews: List[str], max_tokens: int, max_reviews: int) -> List[List[int]]:
+    """Greedily pack review indexes into chunks under the token and count budgets."""
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for index, review in enumerate(reviews):
+        tokens = estimate_tokens(review)
+        if current and (used + tokens > max_tokens or len(current) >= max_reviews):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BatchReviewAnalyzer:
+    """
+    Translation and sentiment for many reviews per LLM call. Reviews are sent
+    in chunks of REVIEW_BATCH_TOKENS; a chunk whose output does not parse, or
+    misses reviews, is split in half and retried, down to the per-review
+    Translation and SentimentAnalysis calls. Chunks run concurrently under
+    the LLM scheduler.
+
+    `analyze_each` trades the batching for latency: every review goes
+    through translation and sentiment on its own and is yielded as soon as
+    both are done.
+    """
+
+    def __init__(self, max_tokens: int = settings.REVIEW_BATCH_TOKENS, max_reviews: int = settings.REVIEW_BATCH_MAX_REVIEWS):
+        self.llm = models.route("review-batch-analysis")
+        self.translation = Translation()
+        self.sentiment_analysis = SentimentAnalysis()
+        self.max_tokens = max_tokens
+        self.max_reviews = max_reviews
+        self.parser = PydanticOutputParser(pydantic_object=ReviewAnalyses)
+        self.prompt = PromptTemplate(
+            template="""You are a language and sentiment expert. For each numbered customer review below:
+            1. Detect the language of the review ('language' as an ISO code, e.g. 'en', 'hi')
+            2. Translate it to English naturally, preserving meaning and sentiment
+               (reviews marked [en] are already English: set 'translation' to null)
+            3. Analyze the translated review:
+               - sentiment: [Positive/Negative/Neutral]
+               - features: [comma-separated list of product features mentioned]
+               - key_aspects: [comma-separated list of main positive and negative points]
+
+            Return exactly one entry per review, with its number as 'id'.
+
+            Reviews:
+            {reviews}
+
+            {format_instructions}""",
+            input_variables=["reviews"],
+            partial_variables={"format_instructions": self.parser.get_format_instructions()}
+        )
+        self.calls = 0
+        self.splits = 0
+
+    async def _analyze_one(self, review: str, english: bool) -> Tuple[TranslationSchema, SentimentSchema]:
+        if english:
+            translation = TranslationSchema(language="en", translation=review)
+        else:
+            translation = await self.translation.translate(review, detect=False)
+        return translation, await self.sentiment_analysis.analyze(translation.translation)
+
+    async def _analyze_chunk(self, reviews: List[Tuple[str, bool]]) -> List[Tuple[TranslationSchema, SentimentSchema]]:
+        # English reviews are detected locally and not echoed back as their own translation
+        formatted_prompt = self.prompt.format(
+            reviews="\n".join(
+                f"{i}. {'[en] ' if english else ''}{review}" for i, (review, english) in enumerate(reviews)
+            )
+        )
+        try:
+            self.calls += 1
+            response = await self.llm.ainvoke(formatted_prompt)
+            # a chunk that cannot be recovered is split below, cheaper than a repair call for the whole batch
+            parsed: ReviewAnalyses = await parse_output("review_batch", response.content, ReviewAnalyses, fix=False)
+            by_id = {analysis.id: analysis for analysis in parsed.reviews}
+            if set(by_id) != set(range(len(reviews))):
+                raise ValueError(f"Expected {len(reviews)} reviews, got ids {sorted(by_id)}")
+        except Exception as e:
+            if len(reviews) == 1:
+                print(f"Analyzing review on its own after failed analysis: {e}")
+                return [await self._analyze_one(*reviews[0])]
+            print(f"Splitting review chunk of {len(reviews)} after failed analysis: {e}")
+            self.splits += 1
+            middle = len(reviews) // 2
+            first, second = await asyncio.gather(self._analyze_chunk(reviews[:middle]), self._analyze_chunk(reviews[middle:]))
+            return first + second
+
+        return [
+            (
+                TranslationSchema(
+                    language="en" if english else by_id[i].language,
+                    translation=review if english or not by_id[i].translation else by_id[i].translation,
+                ),
+                SentimentSchema(sentiment=by_id[i].sentiment, features=by_id[i].features, key_aspects=by_id[i].key_aspects),
+            )
+            for i, (review, english) in enumerate(reviews)
+        ]
+
+    async def analyze(self, reviews: List[str]) -> List[Tuple[TranslationSchema, SentimentSchema]]:
+        """(translation, sentiment) per review, in input order."""
+        marked = [(review, is_confidently_english(review)) for review in reviews]
+        chunks = [[marked[i] for i in chunk] for chunk in chunk_reviews(reviews, self.max_tokens, self.max_reviews)]
+        # chunks are queued on the scheduler together, it decides how many run at once
+        results = await asyncio.gather(*[self._analyze_chunk(chunk) for chunk in chunks])
+        return [result for chunk in results for result in chunk]
+
+    async def analyze_each(self, reviews: List[str]) -> AsyncIterator[Tuple[int, Tuple[TranslationSchema, SentimentSchema]]]:
+        """(index, (translation, sentiment)) per review, in completion order."""
+        async def pipeline(index: int, review: str):
+            return index, await self._analyze_one(review, is_confidently_english(review))
+
+        tasks = [asyncio.ensure_future(pipeline(index, review)) for index, review in enumerate(reviews)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # a consumer that stops early must not leave reviews running
+            for task in tasks:
+                task.cancel()
@@ -1,17 +1,38 @@
-from langchain_openai import ChatOpenAI
+from typing import Dict, List, Optional
+
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel
 
+from ...config.llm import models
+from ..llm.output import parse_output
+
 class SentimentSchema(BaseModel):
     sentiment: str 
     features: str
     key_aspects: str
 
 
+def sentiment_mix(sentiments: List[SentimentSchema], weights: Optional[List[float]] = None) -> Dict[str, float]:
+    """Weighted share of reviews per sentiment label, e.g. {"positive": 0.6, "negative": 0.4}."""
+    weights = weights or [1.0] * len(sentiments)
+    total = sum(weights)
+    if not sentiments or not total:
+        return {}
+    counts: Dict[str, float] = {}
+    for sentiment, weight in zip(sentiments, weights):
+        label = sentiment.sentiment.strip().lower()
+        counts[label] = counts.get(label, 0) + weight
+    return {label: round(count / total, 4) for label, count in counts.items()}
+
+
+def mix_shift(before: Dict[str, float], after: Dict[str, float]) -> float:
+    """Total variation distance between two mixes: 0 when equal, 1 when disjoint."""
+    return sum(abs(before.get(label, 0.0) - after.get(label, 0.0)) for label in set(before) | set(after)) / 2
+
 class SentimentAnalysis():
     def __init__(self):
-        self.llm = ChatOpenAI(temperature=0.1, model="gpt-4o-mini")
+        self.llm = models.route("review-sentiment")
         self.parser = PydanticOutputParser(pydantic_object=SentimentSchema)
         self.prompt = PromptTemplate(
             template="""You are an expert sentiment analyzer. Analyze the following customer review:
@@ -27,9 +48,9 @@ class SentimentAnalysis():
                 partial_variables={"format_instructions": self.parser.get_format_instructions()}
             )
 
-    def analyze(self, text: str) -> SentimentSchema:
+    async def analyze(self, text: str) -> SentimentSchema:
         formatted_prompt = self.prompt.format(text=text)
-        response = self.llm.invoke(formatted_prompt)
-        return self.parser.parse(response.content)
+        response = await self.llm.ainvoke(formatted_prompt)
+        return await parse_output("sentiment", response.content, SentimentSchema)
 
 
@@ -1,15 +1,131 @@
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel
+import re
+import unicodedata
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from ...config.llm import models
+from ...config.main import settings
+from ..llm.output import parse_output
 
 class TranslationSchema(BaseModel):
     language: str 
     translation: str
 
+
+# first word of the unicode character name -> language it most likely means on amazon.in
+SCRIPT_LANGUAGES = {
+    "DEVANAGARI": "hi",
+    "BENGALI": "bn",
+    "GURMUKHI": "pa",
+    "GUJARATI": "gu",
+    "ORIYA": "or",
+    "TAMIL": "ta",
+    "TELUGU": "te",
+    "KANNADA": "kn",
+    "MALAYALAM": "ml",
+    "ARABIC": "ur",
+    "CJK": "zh",
+    "HIRAGANA": "ja",
+    "KATAKANA": "ja",
+    "HANGUL": "ko",
+    "CYRILLIC": "ru",
+}
+
+# function words and review vocabulary, a review in English hits these often
+ENGLISH_WORDS = set("""
+a an the and or but if so of to in on at for with from by as is are was were be been am it its this that these those
+i me my we our you your he she they them their his her not no very too also just only really quite than then
+have has had do does did will would can could should must may might get got make made use used using
+good great nice bad poor best better worst excellent awesome amazing superb perfect fine ok okay happy
+product quality price value money worth buy bought purchase delivery item working works worked work
+battery sound camera screen display size fit design performance service issue problem recommend overall
+after before days months time one all some more most much well like love loved
+""".split())
+
+# romanized hindi words that show up in latin script reviews
+HINGLISH_WORDS = set("""
+hai hain nahi nahin bahut bhut accha acha achha bekar bakwas paisa paise kharab sahi mast ekdum bilkul
+mat lo liya diya kya hi ka ki ke ko se mein me aur par tha thi raha rahi
+""".split())
+
+# romanized hindi words that are also everyday English ("give me", "hi", "yoga mat")
+ENGLISH_HOMOGRAPHS = {"me", "hi", "mat", "lo", "par"}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def _script(char: str) -> str:
+    name = unicodedata.name(char, "")
+    return name.split(" ")[0] if name else ""
+
+
+def detect_language(text: str) -> Tuple[Optional[str], float]:
+    """
+    Best guess ISO code and a confidence in [0, 1], from the letters' scripts
+    and, for latin text, the share of common English vs romanized Hindi words.
+    Returns (None, 0.0) when there is too little text to call, or when mostly
+    English text mixes in romanized Hindi, which needs the llm to translate.
+    """
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return None, 0.0
+
+    scripts: Dict[str, int] = {}
+    for char in letters:
+        script = _script(char)
+        scripts[script] = scripts.get(script, 0) + 1
+    script, count = max(scripts.items(), key=lambda item: item[1])
+    if script != "LATIN":
+        return SCRIPT_LANGUAGES.get(script), count / len(letters)
+
+    words = [word.lower() for word in WORD_PATTERN.findall(text)]
+    if len(words) < settings.LANGUAGE_DETECTION_MIN_WORDS:
+        return None, 0.0
+    english = sum(word in ENGLISH_WORDS for word in words)
+    hinglish = sum(word in HINGLISH_WORDS for word in words)
+    if hinglish > english:
+        return "hi", hinglish / len(words)
+    if any(word in HINGLISH_WORDS and word not in ENGLISH_HOMOGRAPHS for word in words):
+        return None, 0.0
+    latin_share = count / len(letters)
+    return "en", min(1.0, english / len(words) / settings.LANGUAGE_DETECTION_ENGLISH_RATIO) * latin_share
+
+
+class LanguageDetectionStats:
+    """How reviews were routed: kept as English locally, or sent to the llm."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.decisions: Dict[str, int] = {"local_english": 0, "llm_non_english": 0, "llm_ambiguous": 0}
+        self.llm_calls_saved = 0
+
+    def record(self, decision: str, calls_saved: int = 0):
+        with self._lock:
+            self.decisions[decision] += 1
+            self.llm_calls_saved += calls_saved
+
+    def stats(self) -> Dict[str, object]:
+        return {**self.decisions, "llm_calls_saved": self.llm_calls_saved}
+
+
+language_stats = LanguageDetectionStats()
+
+
+def is_confidently_english(text: str, calls_saved: int = 0) -> bool:
+    """Route a text, recording the decision; only the False case needs the llm."""
+    language, confidence = detect_language(text)
+    if language == "en" and confidence >= settings.LANGUAGE_DETECTION_THRESHOLD:
+        language_stats.record("local_english", calls_saved)
+        return True
+    language_stats.record("llm_ambiguous" if language in (None, "en") else "llm_non_english")
+    return False
+
 class Translation():
     def __init__(self):
-        self.llm = ChatOpenAI(temperature=0.3, model="gpt-4o-mini")
+        self.llm = models.route("review-translation")
         self.parser = PydanticOutputParser(pydantic_object=TranslationSchema)
         self.prompt = PromptTemplate(
             template="""You are a language detection and translation expert. Analyze the following text:
@@ -29,10 +145,14 @@ class Translation():
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
 
-    def translate(self, text: str) -> TranslationSchema:
+    async def translate(self, text: str, detect: bool = True) -> TranslationSchema:
+        if detect and is_confidently_english(text, calls_saved=1):
+            # the prompt returns English text unchanged, no need to ask
+            return TranslationSchema(language="en", translation=text)
+
         formatted_prompt = self.prompt.format(text=text)
 
-        response = self.llm.invoke(formatted_prompt)
+        response = await self.llm.ainvoke(formatted_prompt)
         
-        return self.parser.parse(response.content)
+        return await parse_output("translation", response.content, TranslationSchema)
 
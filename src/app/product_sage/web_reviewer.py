@@ -1,4 +1,4 @@
-import concurrent.futures
+import asyncio
 from typing import Dict, List
 import httpx
 from langchain_community.utilities import SerpAPIWrapper
@@ -7,8 +7,10 @@ from langchain_groq import ChatGroq
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel
-from ...config.llm import AIModels
+from ...config.llm import models
 from ...config.main import settings
+from ..llm.output import parse_output
+from ..utils.replay import replayed, replay_transport
 
 class WebsiteReviewSchema(BaseModel):
     positive_points: List[str]
@@ -27,7 +29,7 @@ class WebReviewer:
     def __init__(self, title: str):
         self.title = title
         self.parser = PydanticOutputParser(pydantic_object=TitleSchema)
-        self.llm = AIModels().llama_4_mavrick()
+        self.llm = models.route("llama-4-maverick")
         self.search = SerpAPIWrapper(serpapi_api_key=settings.SERP_API_KEY)
         self.refined_title = None
         self.website_reviewer = WebsiteReviewer()
@@ -36,7 +38,7 @@ class WebReviewer:
         self.reviews:List[ReviewSchema] = []
 
 
-    def refine_title(self):
+    async def refine_title(self):
         prompt = PromptTemplate(
             template="""
             Input: [Full Product Description]
@@ -64,8 +66,7 @@ class WebReviewer:
             SystemMessage(content="You are a helpful assistant that extracts clean product titles."),
             HumanMessage(content=formatted_prompt)
         ]
-        llm = self.llm | self.parser
-        response = llm.invoke(messages)
+        response = await parse_output("refine_title", (await self.llm.ainvoke(messages)).content, TitleSchema)
         if hasattr(response, 'clean_title'):
             self.refined_title = response.clean_title
         else:
@@ -73,10 +74,11 @@ class WebReviewer:
 
         return self.refined_title
     
-    def get_top_website_content(self) -> List[ReviewSchema]:
+    async def get_top_website_content(self) -> List[ReviewSchema]:
         if not self.refined_title:
-            self.refine_title()
-        results = self.search.results(self.refined_title + " review")
+            await self.refine_title()
+        query = self.refined_title + " review"
+        results = await replayed("serpapi", query, lambda: self.search.aresults(query))
         if not results.get("organic_results"):
             return {"error": "No results found"}
 
@@ -90,26 +92,23 @@ class WebReviewer:
                 break
 
         # Process valid entries in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-            futures = {
-                executor.submit(self._process_single_website, entry)
-                for entry in valid_entries
-            }
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    review = future.result()
-                    self.reviews.append(review)
-                except Exception as e:
-                    # Handle or log exceptions as needed
-                    pass
+        results = await asyncio.gather(
+            *[self._process_single_website(entry) for entry in valid_entries],
+            return_exceptions=True
+        )
+        for review in results:
+            if isinstance(review, Exception):
+                # Handle or log exceptions as needed
+                continue
+            self.reviews.append(review)
 
         return self.reviews
     
-    def _process_single_website(self, entry: dict) -> ReviewSchema:
+    async def _process_single_website(self, entry: dict) -> ReviewSchema:
         """Process a single website entry and return ReviewSchema"""
         url = entry.get("link")
         favicon = entry.get("favicon", "")
-        review = self.website_reviewer.analyze_website(url)
+        review = await self.website_reviewer.analyze_website(url)
         return ReviewSchema(
             source=url,
             review=review,
@@ -121,11 +120,12 @@ class WebReviewer:
 class WebsiteReviewer:
     def __init__(self):
         self.url = None
-        self.llm = AIModels().llama_4_mavrick()
+        self.llm = models.route("llama-4-maverick")
         self.parser = PydanticOutputParser(pydantic_object=WebsiteReviewSchema)
 
-    def analyze_website(self, url: str) -> WebsiteReviewSchema:
-        response = httpx.get(f"https://r.jina.ai/{url}", timeout=10)
+    async def analyze_website(self, url: str) -> WebsiteReviewSchema:
+        async with httpx.AsyncClient(transport=replay_transport("jina")) as client:
+            response = await client.get(f"https://r.jina.ai/{url}", timeout=10)
         content = response.text[:30000]
         
         prompt = PromptTemplate(
@@ -160,8 +160,8 @@ class WebsiteReviewer:
             SystemMessage(content="You are a helpful assistant that analyzes websites."),
             HumanMessage(content=formatted_prompt)
         ]
-        response = self.llm.invoke(messages)
-        return self.parser.parse(response.content)
+        response = await self.llm.ainvoke(messages)
+        return await parse_output("website_review", response.content, WebsiteReviewSchema)
 
 
     def get_website_content(self) -> Dict:
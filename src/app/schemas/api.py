@@ -1,8 +1,12 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from ..product_sage.improvement import ProductImprovementSchema
 from ..product_sage.sentiment import SentimentSchema
 
 class ProductSageResponse(BaseModel):
     improvements: List[ProductImprovementSchema]
     sentiments: List[SentimentSchema]
+
+class BatchIngestRequest(BaseModel):
+    asins: List[str]
+    sid: Optional[str] = None
@@ -0,0 +1,34 @@
+import asyncio
+import hashlib
+from typing import Optional, Tuple
+
+import zstandard
+
+from ..database.create.async_main import create_html_archive
+from ..database.read.async_main import fetch_latest_html_by_asin
+from .parse import get_parse_executor
+
+ZSTD_LEVEL = 10
+
+
+def compress_page(html: str) -> Tuple[str, bytes, int]:
+    """Return the sha256 content hash, the zstd-compressed page and its raw size."""
+    raw = html.encode("utf-8")
+    content_hash = hashlib.sha256(raw).hexdigest()
+    return content_hash, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), len(raw)
+
+
+def decompress_page(blob: bytes) -> str:
+    return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+
+
+async def archive_page(asin: str, html: str) -> str:
+    # hashing and compressing a multi-megabyte page is CPU work, keep it off the loop
+    loop = asyncio.get_running_loop()
+    content_hash, blob, size = await loop.run_in_executor(get_parse_executor(), compress_page, html)
+    return await create_html_archive(content_hash, blob, size, asin)
+
+
+async def load_page(asin: str) -> Optional[str]:
+    blob = await fetch_latest_html_by_asin(asin)
+    return decompress_page(blob) if blob is not None else None
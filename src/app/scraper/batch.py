@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from ...config.main import settings
+from ..database.create.async_main import upsert_products
+from ..database.read.async_main import fetch_existing_asins
+
+
+async def write_products(products: Dict[str, Any]) -> List[str]:
+    return await upsert_products(products, scraped_at=datetime.now())
+
+
+async def _write(products: Dict[str, Any], write: Callable[[Dict[str, Any]], Awaitable[Any]]) -> List[Dict[str, Any]]:
+    try:
+        await write(products)
+        return [{"asin": asin, "status": "scraped"} for asin in products]
+    except Exception as e:
+        return [{"asin": asin, "status": "failed", "error": str(e)} for asin in products]
+
+
+async def ingest_batch(
+    asins: List[str],
+    scrape: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+    concurrency: int = settings.BATCH_CONCURRENCY,
+    write: Callable[[Dict[str, Any]], Awaitable[Any]] = write_products,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield one progress event per unique asin: stored ones first, then the
+    missing ones as their scrapes are written, at most `concurrency` scrapes at
+    a time. `scrape` returns None for a product that was stored while it was
+    queued. Scraped products are written together, up to UPSERT_BATCH_SIZE
+    rows or BATCH_FLUSH_SECONDS worth of scrapes per statement, through `write`.
+    """
+    unique = list(dict.fromkeys(asin.strip() for asin in asins if asin and asin.strip()))
+    existing = await fetch_existing_asins(unique)
+    missing = [asin for asin in unique if asin not in existing]
+    total = len(unique)
+    completed = 0
+
+    for asin in unique:
+        if asin in existing:
+            completed += 1
+            yield {"asin": asin, "status": "exists", "completed": completed, "total": total}
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(asin: str):
+        async with semaphore:
+            try:
+                return asin, await scrape(asin), None
+            except Exception as e:
+                return asin, None, str(e)
+
+    loop = asyncio.get_running_loop()
+    scraped: Dict[str, Any] = {}
+    last_flush = loop.time()
+    tasks = [asyncio.create_task(run(asin)) for asin in missing]
+    handled = set()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            asin, details, error = await next_done
+            handled.add(asin)
+            if error is not None:
+                completed += 1
+                yield {"asin": asin, "status": "failed", "error": error, "completed": completed, "total": total}
+            elif details is None:
+                completed += 1
+                yield {"asin": asin, "status": "exists", "completed": completed, "total": total}
+            else:
+                scraped[asin] = details
+
+            if scraped and (len(scraped) >= settings.UPSERT_BATCH_SIZE or loop.time() - last_flush >= settings.BATCH_FLUSH_SECONDS):
+                events = await _write(scraped, write)
+                scraped, last_flush = {}, loop.time()
+                for event in events:
+                    completed += 1
+                    yield {**event, "completed": completed, "total": total}
+
+        if scraped:
+            events = await _write(scraped, write)
+            scraped = {}
+            for event in events:
+                completed += 1
+                yield {**event, "completed": completed, "total": total}
+    finally:
+        # the consumer went away (e.g. the HTTP client disconnected)
+        for task in tasks:
+            if task.done() and not task.cancelled():
+                asin, details, _ = task.result()
+                if details is not None and asin not in handled:
+                    scraped[asin] = details
+            task.cancel()
+        if scraped:
+            # keep the scrapes that already finished, which also drops them from the pending map
+            await _write(scraped, write)
@@ -0,0 +1,106 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+from dibkb_scraper import AmazonScraper
+
+from ...config.main import settings
+
+PARSE_MODES = ("html.parser", "lxml", "lxml-strained")
+
+# The elements AmazonScraper (dibkb-scraper 0.3.4) reads, by tag: ids, class
+# tokens, or attributes any one of which marks an element as wanted. Check them
+# against the scraper's find/find_all calls when upgrading it.
+WANTED_IDS = {
+    "span": {"productTitle", "title"},
+    "div": {"feature-bullets", "detailBullets_feature_div"},
+    "table": {"productDetails_techSpec_section_1", "productDetails_detailBullets_sections1"},
+}
+WANTED_CLASSES = {
+    "div": {"twister-plus-buying-options-price-data", "a-expander-content", "review-text-content"},
+    "span": {"_cr-ratings-histogram_style_histogram-column-space__RKUAd", "reviewCountTextLinkedHistogram"},
+    "ul": {"a-unordered-list"},
+    "li": {"a-carousel-card"},
+}
+WANTED_ATTRIBUTES = {
+    "span": {"data-hook"},
+    "img": {"data-a-dynamic-image"},
+}
+
+
+class ProductStrainer(SoupStrainer):
+    """
+    Keeps only the elements AmazonScraper reads, each with its whole subtree.
+    bs4 asks the strainer about a tag only while no wanted ancestor is open,
+    so everything between the wanted elements (head, nav, styles, svg, ads)
+    is never built. Scripts are kept because the image data is looked up by
+    script text, which is not known when the tag is created.
+    """
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        if name == "script":
+            return True
+        attrs = attrs or {}
+        if attrs.get("id") in WANTED_IDS.get(name, ()):
+            return True
+        classes = attrs.get("class") or ""
+        if isinstance(classes, str):
+            classes = classes.split()
+        if WANTED_CLASSES.get(name, set()).intersection(classes):
+            return True
+        return any(attribute in attrs for attribute in WANTED_ATTRIBUTES.get(name, ()))
+
+    def allow_string_creation(self, string: str) -> bool:
+        return False
+
+
+_strainer = ProductStrainer()
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def make_soup(html: str, mode: str = settings.SCRAPER_PARSER) -> BeautifulSoup:
+    if mode == "html.parser":
+        return BeautifulSoup(html, "html.parser")
+    if mode == "lxml":
+        return BeautifulSoup(html, "lxml")
+    if mode == "lxml-strained":
+        return BeautifulSoup(html, "lxml", parse_only=_strainer)
+    raise ValueError(f"Unknown parse mode: {mode}")
+
+
+def parse_product(asin: str, html: str, mode: str = settings.SCRAPER_PARSER) -> Dict[str, Any]:
+    """Parse a product page into the AmazonScraper details dict. Runs inside a worker process."""
+    soup = make_soup(html, mode)
+    return AmazonScraper(asin, soup).get_all_details()
+
+
+def validate_product(details: Dict[str, Any]) -> Dict[str, Any]:
+    if details['product'] is None:
+        raise Exception("Product not found")
+
+    result = details['product']
+    if result['title'] == None or result['title'] == "":
+        raise Exception("Product title not found")
+    if result['price'] == None or result['price'] == "":
+        raise Exception("Product price not found")
+    return result
+
+
+def get_parse_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.PARSER_WORKERS)
+    return _executor
+
+
+async def parse_product_async(asin: str, html: str, mode: str = settings.SCRAPER_PARSER) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_executor(), parse_product, asin, html, mode)
+
+
+def shutdown_parse_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
@@ -0,0 +1,306 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from fake_useragent import UserAgent
+from playwright.async_api import async_playwright
+from playwright_stealth import stealth_async
+
+from ...config.main import settings
+
+# resource types we never need to build the product HTML
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+FIRST_PARTY_DOMAINS = ("amazon.in", "amazon.com", "media-amazon.com", "ssl-images-amazon.com", "images-amazon.com")
+
+
+class PooledContext:
+    def __init__(self, context, context_id: int):
+        self.context = context
+        self.context_id = context_id
+        self.open_pages = 0
+        self.navigations = 0
+        self.broken = False
+
+    @property
+    def retiring(self) -> bool:
+        return self.broken or self.navigations >= settings.SCRAPER_RECYCLE_AFTER
+
+
+class ScraperPool:
+    """
+    Keeps N warm browser contexts on one Chromium instance and hands out pages
+    under a bounded concurrency limit. A context is recycled once it has served
+    SCRAPER_RECYCLE_AFTER navigations or one of its pages crashed.
+    """
+
+    def __init__(
+        self,
+        size: int = settings.SCRAPER_POOL_SIZE,
+        max_pages: int = settings.SCRAPER_MAX_PAGES,
+        block_resources: bool = settings.SCRAPER_BLOCK_RESOURCES,
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.block_resources = block_resources
+        self._playwright = None
+        self._browser = None
+        self._contexts: List[PooledContext] = []
+        self._pages = asyncio.Semaphore(max_pages)
+        self._lock = asyncio.Lock()
+        self._next_context_id = 0
+        self._initialized = False
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.acquired = 0
+        self.navigations = 0
+        self.recycled = 0
+        self.crashes = 0
+        self.blocked_requests = 0
+
+    async def initialize(self):
+        if self._initialized:
+            return
+        try:
+            self._playwright = await async_playwright().start()
+            await self._launch_browser()
+            self._initialized = True
+            print(f"Scraper pool initialized with {self.size} contexts and {self.max_pages} pages")
+        except Exception as e:
+            print(f"Failed to initialize scraper pool: {e}")
+
+    async def _launch_browser(self):
+        self._browser = await self._playwright.chromium.launch(
+            headless=True,
+            args=[
+                '--disable-blink-features=AutomationControlled',
+                '--disable-features=IsolateOrigins,site-per-process',
+                '--disable-site-isolation-trials',
+            ]
+        )
+        self._contexts = [await self._new_context() for _ in range(self.size)]
+
+    async def close(self):
+        for pooled in self._contexts:
+            await self._close_context(pooled)
+        self._contexts = []
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        self._initialized = False
+        print("Scraper pool closed")
+
+    async def _new_context(self) -> PooledContext:
+        viewport_width = random.randint(1920, 2560)
+        viewport_height = random.randint(1080, 1440)
+        user_agent = UserAgent().random
+        headers = {
+            'User-Agent': user_agent,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+            'Cache-Control': 'max-age=0',
+        }
+        context = await self._browser.new_context(
+            viewport={'width': viewport_width, 'height': viewport_height},
+            user_agent=user_agent,
+            ignore_https_errors=True,
+            extra_http_headers=headers,
+            locale='en-US',
+            timezone_id='America/New_York',
+            geolocation={'latitude': 40.730610, 'longitude': -73.935242},
+            permissions=['geolocation']
+        )
+        await context.add_cookies([
+            {"name": "session-id", "value": str(random.randint(10000000, 99999999)), "domain": ".amazon.in", "path": "/"},
+            {"name": "i18n-prefs", "value": "USD", "domain": ".amazon.in", "path": "/"},
+        ])
+        if self.block_resources:
+            await context.route("**/*", self._intercept)
+
+        self._next_context_id += 1
+        return PooledContext(context, self._next_context_id)
+
+    async def _close_context(self, pooled: PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            print(f"Error closing context {pooled.context_id}: {e}")
+
+    async def _intercept(self, route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or (
+            request.resource_type == "script" and not self._is_first_party(request.url)
+        ):
+            self.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @staticmethod
+    def _is_first_party(url: str) -> bool:
+        host = urlparse(url).hostname or ""
+        return any(host == domain or host.endswith("." + domain) for domain in FIRST_PARTY_DOMAINS)
+
+    async def _acquire_context(self) -> PooledContext:
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                print("Browser disconnected, relaunching")
+                self.crashes += 1
+                # contexts of a dead browser mostly fail to close, _close_context logs that
+                for pooled in self._contexts:
+                    await self._close_context(pooled)
+                await self._launch_browser()
+
+            # replace retired contexts once they have no open pages left
+            for index, pooled in enumerate(self._contexts):
+                if pooled.retiring and pooled.open_pages == 0:
+                    await self._close_context(pooled)
+                    self._contexts[index] = await self._new_context()
+                    self.recycled += 1
+
+            candidates = [pooled for pooled in self._contexts if not pooled.retiring]
+            if not candidates:
+                pooled = await self._new_context()
+                self._contexts.append(pooled)
+                candidates = [pooled]
+
+            pooled = min(candidates, key=lambda c: c.open_pages)
+            pooled.open_pages += 1
+            return pooled
+
+    async def _release_context(self, pooled: PooledContext):
+        pooled.open_pages -= 1
+        if pooled.retiring and pooled.open_pages == 0:
+            async with self._lock:
+                if pooled in self._contexts and len(self._contexts) > self.size:
+                    # overflow context created while every warm one was retiring
+                    self._contexts.remove(pooled)
+                    await self._close_context(pooled)
+                    self.recycled += 1
+
+    async def get_html_content(self, url: str, max_retries: int = 3) -> Optional[str]:
+        if not self._initialized:
+            await self.initialize()
+            if not self._initialized:
+                return None
+
+        for attempt in range(max_retries):
+            started = time.perf_counter()
+            self.waiting += 1
+            try:
+                await self._pages.acquire()
+            finally:
+                # also when the caller is cancelled while queued
+                self.waiting -= 1
+            try:
+                waited = time.perf_counter() - started
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                self.acquired += 1
+                self.in_flight += 1
+                try:
+                    html = await self._fetch(url)
+                finally:
+                    self.in_flight -= 1
+            finally:
+                self._pages.release()
+            if html is not None:
+                return html
+            print(f"Retrying... (attempt {attempt + 1}/{max_retries})")
+        return None
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        pooled = await self._acquire_context()
+        page = None
+        try:
+            page = await pooled.context.new_page()
+            page.on("crash", lambda _: self._mark_crashed(pooled))
+            await stealth_async(page)
+
+            viewport = page.viewport_size or {"width": 1920, "height": 1080}
+            await page.mouse.move(random.randint(0, viewport["width"]), random.randint(0, viewport["height"]))
+
+            pooled.navigations += 1
+            self.navigations += 1
+            await page.goto(url, timeout=30000)
+
+            current_url = page.url
+            if "captcha" in current_url.lower() or "robot" in current_url.lower():
+                print(f"Hit CAPTCHA or bot detection at {current_url}")
+                # a flagged context keeps getting challenged, rotate it
+                pooled.broken = True
+                return None
+
+            await page.evaluate("""
+                window.scrollTo({
+                    top: 1000,
+                    behavior: 'smooth'
+                });
+            """)
+            await page.wait_for_timeout(3000)
+            html_content = await page.content()
+
+            if len(html_content) < 5000 and ("robot" in html_content.lower() or
+                                            "captcha" in html_content.lower() or
+                                            "blocked" in html_content.lower() or
+                                            "verify" in html_content.lower()):
+                print("Got bot detection page response")
+                pooled.broken = True
+                return None
+
+            return html_content
+        except Exception as e:
+            print(f"Error getting HTML content: {e}")
+            # start the retry from a fresh context, as the old scraper did
+            pooled.broken = True
+            return None
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            await self._release_context(pooled)
+
+    def _mark_crashed(self, pooled: PooledContext):
+        if not pooled.broken:
+            pooled.broken = True
+            self.crashes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "contexts": [
+                {
+                    "id": pooled.context_id,
+                    "open_pages": pooled.open_pages,
+                    "navigations": pooled.navigations,
+                    "retiring": pooled.retiring,
+                }
+                for pooled in self._contexts
+            ],
+            "max_pages": self.max_pages,
+            "in_flight": self.in_flight,
+            "utilization": self.in_flight / self.max_pages if self.max_pages else 0,
+            "waiting": self.waiting,
+            "avg_wait_seconds": self.total_wait / self.acquired if self.acquired else 0,
+            "max_wait_seconds": self.max_wait,
+            "navigations": self.navigations,
+            "recycled": self.recycled,
+            "crashes": self.crashes,
+            "blocked_requests": self.blocked_requests,
+        }
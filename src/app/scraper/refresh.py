@@ -0,0 +1,201 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ...config.main import settings
+from ..database.create.async_main import record_product_reads, upsert_product, upsert_products
+from ..database.read.async_main import fetch_stale_asins
+from ..utils.singleflight import SingleFlight
+
+# how long a row is served before it is refreshed in the background, per table
+TTL_POLICY: Dict[str, timedelta] = {
+    "products": timedelta(hours=settings.PRODUCT_TTL_HOURS),
+}
+
+
+def is_stale(table: str, scraped_at: Optional[Any]) -> bool:
+    if scraped_at is None:
+        return True
+    if isinstance(scraped_at, str):
+        scraped_at = datetime.fromisoformat(scraped_at)
+    return datetime.now() - scraped_at > TTL_POLICY[table]
+
+
+class ProductRefresher:
+    """
+    Stale-while-revalidate for scraped products. Reads of stale rows schedule a
+    background re-scrape, and a sweeper refreshes the most read stale products.
+    Both share one budget of REFRESH_BUDGET_PER_MINUTE scrapes per minute; a
+    read that finds it spent leaves the product to the sweeper. An asin whose
+    refresh failed is not retried for REFRESH_RETRY_BACKOFF seconds, doubling
+    per consecutive failure up to REFRESH_RETRY_MAX_BACKOFF.
+    """
+
+    def __init__(self, scrape: Callable[[str], Awaitable[Dict[str, Any]]]):
+        self.scrape = scrape
+        self._flight = SingleFlight("product_refresh")
+        self._pending_reads: Dict[str, int] = {}
+        self._tasks = set()
+        self._sweeper: Optional[asyncio.Task] = None
+        # asin -> (consecutive failures, monotonic time before which it is not retried)
+        self._attempts: Dict[str, Tuple[int, float]] = {}
+        self._tokens = float(self._budget_capacity())
+        self._refilled_at = time.monotonic()
+        self.refreshed = 0
+        self.failed = 0
+        self.swept = 0
+        self.deferred = 0
+
+    def note_read(self, asin: str, product: Dict[str, Any]):
+        # reads are buffered and flushed by the sweeper instead of writing on every hit
+        self._pending_reads[asin] = self._pending_reads.get(asin, 0) + 1
+        if not is_stale("products", product.get("scraped_at")) or self._backing_off(asin):
+            return
+        if self._take_budget():
+            self.refresh_in_background(asin)
+        else:
+            self.deferred += 1
+
+    @staticmethod
+    def _budget_capacity() -> float:
+        # a sweep may spend everything that accrued since the previous one
+        per_minute = settings.REFRESH_BUDGET_PER_MINUTE
+        return max(per_minute, per_minute * settings.REFRESH_SWEEP_INTERVAL / 60)
+
+    def _refill(self):
+        now = time.monotonic()
+        rate = settings.REFRESH_BUDGET_PER_MINUTE / 60
+        self._tokens = min(self._budget_capacity(), self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+
+    def _take_budget(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _backing_off(self, asin: str) -> bool:
+        attempt = self._attempts.get(asin)
+        return attempt is not None and time.monotonic() < attempt[1]
+
+    def _started(self, asin: str):
+        # holds off further reads of the same asin while this attempt runs
+        failures = self._attempts.get(asin, (0, 0.0))[0]
+        self._attempts[asin] = (failures, time.monotonic() + settings.REFRESH_RETRY_BACKOFF)
+
+    def _succeeded(self, asin: str):
+        self._attempts.pop(asin, None)
+        self.refreshed += 1
+
+    def _failed(self, asin: str, error: Exception):
+        failures = self._attempts.get(asin, (0, 0.0))[0] + 1
+        backoff = min(settings.REFRESH_RETRY_BACKOFF * 2 ** (failures - 1), settings.REFRESH_RETRY_MAX_BACKOFF)
+        self._attempts[asin] = (failures, time.monotonic() + backoff)
+        self.failed += 1
+        print(f"Error refreshing product {asin} (attempt {failures}, retry in {backoff:.0f}s): {error}")
+
+    def _prune_attempts(self):
+        # forget asins whose backoff ran out long ago, a failure after that starts over
+        expired = time.monotonic() - settings.REFRESH_RETRY_MAX_BACKOFF
+        for asin in [asin for asin, (_, retry_at) in self._attempts.items() if retry_at < expired]:
+            del self._attempts[asin]
+
+    def refresh_in_background(self, asin: str):
+        task = asyncio.create_task(self._refresh_quietly(asin))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _scrape(self, asin: str) -> Dict[str, Any]:
+        return await self._flight.do(asin, lambda: self.scrape(asin))
+
+    async def refresh(self, asin: str) -> Dict[str, Any]:
+        self._started(asin)
+        try:
+            product = await upsert_product(await self._scrape(asin), asin, scraped_at=datetime.now())
+        except Exception as e:
+            self._failed(asin, e)
+            raise
+        self._succeeded(asin)
+        return product
+
+    async def _refresh_quietly(self, asin: str):
+        try:
+            await self.refresh(asin)
+        except Exception:
+            # the stale row keeps being served until a refresh succeeds
+            pass
+
+    async def flush_reads(self):
+        reads, self._pending_reads = self._pending_reads, {}
+        if reads:
+            await record_product_reads(reads, datetime.now())
+
+    async def sweep(self):
+        await self.flush_reads()
+        self._prune_attempts()
+        self._refill()
+        if self._tokens < 1:
+            return
+        stale_before = datetime.now() - TTL_POLICY["products"]
+        backing_off = [asin for asin in self._attempts if self._backing_off(asin)]
+        scraped: Dict[str, Any] = {}
+        for asin in await fetch_stale_asins(stale_before, int(self._tokens), exclude=backing_off):
+            if self._backing_off(asin):
+                # a read started refreshing it while the query ran
+                continue
+            if not self._take_budget():
+                break
+            self.swept += 1
+            self._started(asin)
+            try:
+                scraped[asin] = await self._scrape(asin)
+            except Exception as e:
+                self._failed(asin, e)
+        # the whole sweep is written in one upsert
+        try:
+            written = await upsert_products(scraped, scraped_at=datetime.now())
+        except Exception as e:
+            print(f"Error writing refreshed products: {e}")
+            for asin in scraped:
+                self._failed(asin, e)
+            return
+        for asin in written:
+            self._succeeded(asin)
+
+    async def run_sweeper(self):
+        while True:
+            started = asyncio.get_running_loop().time()
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Error sweeping stale products: {e}")
+            elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(max(0, settings.REFRESH_SWEEP_INTERVAL - elapsed))
+
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self.run_sweeper())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        try:
+            await self.flush_reads()
+        except Exception as e:
+            print(f"Error flushing product reads: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": {table: ttl.total_seconds() for table, ttl in TTL_POLICY.items()},
+            "pending_reads": len(self._pending_reads),
+            "in_flight": self._flight.stats()["in_flight"],
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "swept": self.swept,
+            "deferred": self.deferred,
+            "backing_off": sum(1 for asin in self._attempts if self._backing_off(asin)),
+            "budget_remaining": int(self._tokens),
+        }
@@ -0,0 +1,90 @@
+"""
+Rebuild `products` rows from the raw HTML archive with the installed
+dibkb_scraper version, without going through the browser.
+
+    python -m src.app.scraper.reparse                 # every archived asin
+    python -m src.app.scraper.reparse B0DGJ7HYG1 ...  # selected asins
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+from typing import Any, Dict, List, Optional
+
+from ...config.main import settings
+from ..database.create.async_main import upsert_products
+from ..database.read.async_main import fetch_archived_asins, fetch_latest_html_by_asin
+from .archive import decompress_page
+from .parse import parse_product, validate_product
+
+
+def reparse_blob(asin: str, blob: bytes, mode: str) -> Dict[str, Any]:
+    # runs in a worker, so only the compressed page crosses the process boundary
+    return validate_product(parse_product(asin, decompress_page(blob), mode))
+
+
+async def reparse(asins: Optional[List[str]] = None, workers: int = settings.PARSER_WORKERS, mode: str = settings.SCRAPER_PARSER):
+    asins = asins or await fetch_archived_asins()
+    print(f"Reparsing {len(asins)} products with dibkb-scraper {version('dibkb-scraper')} ({mode}, {workers} workers)")
+
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    updated, failed = 0, 0
+    pending: Dict[asyncio.Future, str] = {}
+    parsed: Dict[str, Any] = {}
+
+    async def flush():
+        nonlocal updated, failed
+        try:
+            updated += len(await upsert_products(parsed))
+        except Exception as e:
+            print(f"Failed to write {len(parsed)} products: {e}")
+            failed += len(parsed)
+        parsed.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        queue = iter(asins)
+        while True:
+            # keep a bounded window of pages in flight instead of loading the whole archive
+            while len(pending) < workers * 2:
+                asin = next(queue, None)
+                if asin is None:
+                    break
+                blob = await fetch_latest_html_by_asin(asin)
+                if blob is None:
+                    print(f"{asin}: no archived page")
+                    failed += 1
+                    continue
+                pending[loop.run_in_executor(executor, reparse_blob, asin, blob, mode)] = asin
+
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                asin = pending.pop(future)
+                try:
+                    parsed[asin] = future.result()
+                except Exception as e:
+                    print(f"{asin}: {e}")
+                    failed += 1
+            if len(parsed) >= settings.UPSERT_BATCH_SIZE:
+                await flush()
+    await flush()
+
+    print(f"Reparsed {updated} products, {failed} failed in {time.perf_counter() - started:.1f}s")
+    return updated, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("asins", nargs="*", help="asins to reparse, defaults to the whole archive")
+    parser.add_argument("--workers", type=int, default=settings.PARSER_WORKERS)
+    parser.add_argument("--mode", default=settings.SCRAPER_PARSER)
+    args = parser.parse_args()
+    asyncio.run(reparse(args.asins, args.workers, args.mode))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+In-process access to products and their derived analyses.
+
+Route handlers, batch ingest and SWOT all go through these functions instead
+of calling the backend's own HTTP endpoints, so a product is read or computed
+once per process and handed around as the same dict.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ...config.llm import models
+from ...config.main import settings
+from ..database.create.async_main import create_product, create_product_enhancements, create_product_sage, create_product_web_reviewer, update_review_analysis
+from ..database.create.statements import review_set_hash
+from ..database.cache import row_cache
+from ..database.main import async_engine, engine
+from ..database.pool import pool_stats
+from ..database.read.async_main import fetch_product_by_asin, fetch_product_fields, fetch_product_enhancements_by_asin, fetch_product_reviews, fetch_product_sage_by_asin, fetch_product_web_reviewer_by_asin
+from ..llm.cache import install_llm_cache, llm_cache_stats
+from ..llm.output import output_stats
+from ..llm.scheduler import scheduler
+from ..product_enhancer.enhance import ProductEnhancer
+from ..product_sage.main import ProductSage
+from ..product_sage.improvement import ProductImprovementSchema
+from ..product_sage.preprocess import select_reviews_async
+from ..product_sage.sentiment import SentimentSchema, mix_shift, sentiment_mix
+from ..product_sage.translation import TranslationSchema, language_stats
+from ..product_sage.web_reviewer import WebReviewer
+from ..scraper.archive import archive_page
+from ..scraper.batch import write_products
+from ..scraper.parse import parse_product_async, shutdown_parse_executor, validate_product
+from ..scraper.pool import ScraperPool
+from ..scraper.refresh import ProductRefresher
+from ..utils.replay import replay, replayed
+from ..utils.singleflight import SingleFlight
+
+# one in-flight computation per asin for each cache-miss path
+product_flight = SingleFlight("product")
+product_sage_flight = SingleFlight("product_sage")
+web_reviewer_flight = SingleFlight("web_reviewer")
+enhancements_flight = SingleFlight("enhancements")
+
+scraper_pool = ScraperPool()
+
+
+async def scrape_product_details(asin: str) -> Dict[str, Any]:
+    url = f"https://www.amazon.in/dp/{asin}"
+    html = await replayed("amazon", url, lambda: scraper_pool.get_html_content(url))
+    if html is None:
+        raise Exception("Failed to fetch page")
+    try:
+        await archive_page(asin, html)
+    except Exception as e:
+        # the archive is best effort, a failed write must not lose the scrape
+        print(f"Error archiving page for {asin}: {e}")
+
+    product = await parse_product_async(asin, html)
+    return validate_product(product)
+
+
+product_refresher = ProductRefresher(scrape_product_details)
+
+# asin -> details scraped by batch ingest whose bulk write has not run yet
+pending_products: Dict[str, Dict[str, Any]] = {}
+
+
+async def _scrape_product(asin: str, store: bool = True) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    (stored product, None), or (None, scraped details) when store=False leaves
+    the write to the caller. Callers of either kind share product_flight, so
+    they can be handed the other kind's result.
+    """
+    # a concurrent flight may have stored the product since the caller checked
+    product = await fetch_product_by_asin(asin)
+    if product is not None:
+        return product, None
+    pending = pending_products.get(asin)
+    if pending is not None:
+        # a batch ingest scraped it and has not flushed yet
+        return (await create_product(pending, asin), None) if store else (None, None)
+
+    result = await scrape_product_details(asin)
+    if not store:
+        # registered before the flight ends, so no caller misses both
+        pending_products[asin] = result
+        return None, result
+    return await create_product(result, asin), None
+
+
+async def get_product(asin: str) -> Dict[str, Any]:
+    product = await fetch_product_by_asin(asin)
+    if product is None:
+        product, details = await product_flight.do(asin, lambda: _scrape_product(asin))
+        if product is None:
+            # joined a batch ingest scrape, whose bulk write may still be pending
+            product = await create_product(details, asin)
+        return product
+
+    product_refresher.note_read(asin, product)
+    return product
+
+
+async def scrape_missing_product(asin: str) -> Optional[Dict[str, Any]]:
+    """
+    Scraped details for batch ingest to write in bulk, or None when the product
+    is stored already, including by a concurrent request while it was queued.
+    """
+    _, details = await product_flight.do(asin, lambda: _scrape_product(asin, store=False))
+    return details
+
+
+async def write_scraped_products(products: Dict[str, Any]) -> List[str]:
+    """Bulk write for batch ingest; get_product serves the products from pending_products until it is done."""
+    try:
+        return await write_products(products)
+    finally:
+        for asin, details in products.items():
+            if pending_products.get(asin) is details:
+                del pending_products[asin]
+
+
+async def get_product_with_reviews(asin: str) -> Dict[str, Any]:
+    """The product as the API returns it, with the review text joined back in page order."""
+    product = await get_product(asin)
+    if "reviews" in product:
+        # a fresh scrape already carries its reviews
+        return product
+    reviews = await fetch_product_reviews(asin, product.get("review_hashes") or [])
+    return {**product, "reviews": [review["text"] for review in reviews]}
+
+
+async def get_product_fields(asin: str, fields: List[str]) -> Dict[str, Any]:
+    """Selected product columns, scraping the product first if it is not stored yet."""
+    product = await fetch_product_fields(asin, fields)
+    if product is None:
+        product = await get_product(asin)
+    return {field: product[field] for field in fields}
+
+
+sage_stats = {
+    "reviews_reused": 0,
+    "reviews_analyzed": 0,
+    "duplicates_dropped": 0,
+    "sampled_out": 0,
+    "improvements_kept": 0,
+    "improvements_generated": 0,
+}
+
+# called with (index into the sage's sentiments, sentiment) for each analysed review as it finishes
+SentimentCallback = Callable[[int, SentimentSchema], Awaitable[None]]
+
+
+async def _current_sage(asin: str) -> Optional[Dict[str, Any]]:
+    """The stored sage, or None when there is none or it was computed from another set of reviews."""
+    sage = await fetch_product_sage_by_asin(asin)
+    if sage is None:
+        return None
+    product = await get_product_fields(asin, ["review_hashes"])
+    if sage.get("review_set") != review_set_hash(product["review_hashes"] or []):
+        return None
+    return sage
+
+
+async def _generate_sage(asin: str, on_sentiment: Optional[SentimentCallback] = None) -> Dict[str, Any]:
+    """
+    Compute the sage for the product's current reviews. Only reviews without a
+    stored analysis go to the LLM, and the improvements of an earlier sage are
+    kept unless the sentiment mix has moved by SAGE_IMPROVEMENT_MIX_THRESHOLD.
+    Sentiments cover the deduplicated sample, review_indexes[i] is the position
+    in the product's reviews of the review sentiments[i] belongs to.
+    """
+    previous = await fetch_product_sage_by_asin(asin)
+    product = await get_product_fields(asin, ["specifications", "review_hashes"])
+    review_set = review_set_hash(product["review_hashes"] or [])
+    if previous is not None and previous.get("review_set") == review_set:
+        return previous
+
+    stored = await fetch_product_reviews(asin, product['review_hashes'] or [])
+    reviews: List[str] = [review["text"] for review in stored]
+    # reviews analysed for an earlier scrape keep their translation and sentiment
+    analyzed = {
+        review["text"]: (
+            TranslationSchema(language=review["language"], translation=review["translation"]),
+            SentimentSchema(**review["sentiment"]),
+        )
+        for review in stored if review["sentiment"] is not None
+    }
+    # duplicates collapsed and large pages sampled, the sage covers only the sample
+    sample, selection = await select_reviews_async(reviews, set(analyzed))
+    product_sage = ProductSage(product['specifications'], sample, selection, analyzed)
+    sage_stats["reviews_reused"] += sum(review in analyzed for review in product_sage.reviews)
+    sage_stats["reviews_analyzed"] += sum(review not in analyzed for review in product_sage.reviews)
+    sage_stats["duplicates_dropped"] += product_sage.selection.exact_duplicates + product_sage.selection.near_duplicates
+    sage_stats["sampled_out"] += product_sage.selection.sampled_out
+    if on_sentiment is None:
+        sentiments = await product_sage.get_analysis()
+    else:
+        async for index, _, sentiment in product_sage.stream_analysis():
+            await on_sentiment(index, sentiment)
+        sentiments = product_sage.sentiment_analysis_results
+    await update_review_analysis(asin, [
+        {
+            "content_hash": review["content_hash"],
+            "language": translation.language,
+            "translation": translation.translation,
+            "sentiment": sentiment.model_dump(),
+        }
+        for review, translation, sentiment in zip(
+            [stored[sampled.index] for sampled in product_sage.sample], product_sage.translated_reviews, sentiments
+        )
+        if review["sentiment"] is None
+    ])
+
+    mix = sentiment_mix(sentiments, product_sage.weights)
+    previous_mix = None
+    if previous is not None and previous["improvements"]:
+        # sages stored before the mix was recorded were generated from their own sentiments
+        previous_mix = previous.get("improvement_mix") or sentiment_mix(
+            [SentimentSchema(**sentiment) for sentiment in previous["sentiments"] or []], previous.get("weights")
+        )
+    if previous_mix and mix_shift(previous_mix, mix) < settings.SAGE_IMPROVEMENT_MIX_THRESHOLD:
+        improvements = [ProductImprovementSchema(**improvement) for improvement in previous["improvements"]]
+        mix = previous_mix
+        sage_stats["improvements_kept"] += 1
+    else:
+        improvements = await product_sage.get_product_improvement()
+        sage_stats["improvements_generated"] += 1
+
+    await create_product_sage(improvements, sentiments, asin, review_set, mix, product_sage.weights, product_sage.review_indexes)
+    return {
+        "asin": asin,
+        "improvements": [improvement.model_dump() for improvement in improvements],
+        "sentiments": [sentiment.model_dump() for sentiment in sentiments],
+        "review_set": review_set,
+        "improvement_mix": mix,
+        "weights": product_sage.weights,
+        "review_indexes": product_sage.review_indexes,
+    }
+
+
+async def get_sage(asin: str) -> Dict[str, Any]:
+    sage = await _current_sage(asin)
+    if sage is None:
+        return await product_sage_flight.do(asin, lambda: _generate_sage(asin))
+    return sage
+
+
+async def stream_sage(asin: str, on_sentiment: SentimentCallback) -> Dict[str, Any]:
+    """
+    get_sage, reporting each review's sentiment as soon as it is ready. A
+    stored sage, or one computed by a flight another caller started, is
+    reported all at once when it is available.
+    """
+    reported = set()
+
+    async def report(index: int, sentiment: SentimentSchema):
+        reported.add(index)
+        await on_sentiment(index, sentiment)
+
+    sage = await _current_sage(asin)
+    if sage is None:
+        sage = await product_sage_flight.do(asin, lambda: _generate_sage(asin, report))
+    for index, sentiment in enumerate(sage["sentiments"] or []):
+        if index not in reported:
+            await on_sentiment(index, SentimentSchema(**sentiment))
+    return sage
+
+
+async def _generate_web_reviews(asin: str) -> List[Dict[str, Any]]:
+    web_reviewer = await fetch_product_web_reviewer_by_asin(asin)
+    if web_reviewer is not None:
+        return web_reviewer['reviews']
+
+    product = await get_product_fields(asin, ["title"])
+    reviewer = WebReviewer(product['title'])
+    reviews = await reviewer.get_top_website_content()
+    await create_product_web_reviewer(reviews, asin)
+    return [review.model_dump() for review in reviews]
+
+
+async def get_web_reviews(asin: str) -> List[Dict[str, Any]]:
+    web_reviewer = await fetch_product_web_reviewer_by_asin(asin)
+    if web_reviewer is None:
+        return await web_reviewer_flight.do(asin, lambda: _generate_web_reviews(asin))
+    return web_reviewer['reviews']
+
+
+async def _generate_enhancements(asin: str) -> Dict[str, Any]:
+    enhancements = await fetch_product_enhancements_by_asin(asin)
+    if enhancements is not None:
+        return enhancements
+
+    product = await get_product_fields(asin, ["title", "description", "specifications"])
+    product_enhancer = ProductEnhancer(product)
+    content = await product_enhancer.generate_enhanced_listing()
+    await create_product_enhancements(content, asin)
+
+    return {
+        "asin": asin,
+        "enhancements": content
+    }
+
+
+async def get_enhancements(asin: str) -> Dict[str, Any]:
+    enhancements = await fetch_product_enhancements_by_asin(asin)
+    if enhancements is None:
+        return await enhancements_flight.do(asin, lambda: _generate_enhancements(asin))
+    return enhancements
+
+
+async def initialize():
+    install_llm_cache()
+    if replay.mode != "replay":
+        # replayed pages need no browser
+        await scraper_pool.initialize()
+    product_refresher.start()
+
+
+async def shutdown():
+    await product_refresher.stop()
+    await scraper_pool.close()
+    shutdown_parse_executor()
+    await models.aclose()
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "scraper": scraper_pool.stats(),
+        "refresh": product_refresher.stats(),
+        "db_cache": row_cache.stats(),
+        "db_pool": {"sync": pool_stats(engine), "async": pool_stats(async_engine)},
+        "language_detection": language_stats.stats(),
+        "sage": dict(sage_stats),
+        "llm_cache": llm_cache_stats(),
+        "llm_scheduler": scheduler.stats(),
+        "llm_models": models.stats(),
+        "llm_router": models.router_stats(),
+        "llm_output": output_stats.stats(),
+        "replay": replay.stats(),
+        "flights": {
+            flight.name: flight.stats()
+            for flight in (product_flight, product_sage_flight, web_reviewer_flight, enhancements_flight)
+        },
+    }
@@ -1,14 +1,14 @@
 from typing import Dict, List
-import httpx
-import os
 import dotenv
-from langchain_groq import ChatGroq
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain.prompts import PromptTemplate
 from typing import Optional
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel
 import asyncio
+from ...config.llm import models
+from ..llm.output import parse_output
+from ..services import product_service
 
 dotenv.load_dotenv()
 
@@ -24,45 +24,27 @@ class Swot:
     def __init__(self, asin: str,competitors: List[str]):
         self.asin = asin
         self.competitors = competitors
-        self.llm = ChatGroq(temperature=0.7, model="llama-3.3-70b-versatile")
+        self.llm = models.route("llama-3.3-70b")
         self.parser_consolidated = PydanticOutputParser(pydantic_object=SwotAnalysisConsolidated)
 
     async def load_asin_info(self, asin: str) -> Dict:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                # Get basic product info
-                response = await client.get(f"{os.getenv('BACKEND_URL')}/amazon/{asin}")
-                response.raise_for_status()
-                product = response.json()
-                product_info = {
-                    "description": product["description"],
-                    "specifications": product["specifications"]
-                }
-
-                # Get product sage info
-                response = await client.get(f"{os.getenv('BACKEND_URL')}/amazon/product-sage/{asin}")
-                response.raise_for_status()
-                product_sage = response.json()
-                product_info["sentiments"] = product_sage["sentiments"]
-                product_info["improvements"] = product_sage["improvements"]
-
-                # Get web reviewer info
-                response = await client.get(f"{os.getenv('BACKEND_URL')}/amazon/product-sage/web-reviewer/{asin}")
-                response.raise_for_status()
-                product_web_reviewer = response.json()
-                product_info["web_reviewer"] = product_web_reviewer
-
-                return product_info
-
-            except httpx.TimeoutException:
-                print(f"Request timed out for ASIN: {asin}")
-                raise
-            except httpx.RequestError as e:
-                print(f"An error occurred while requesting data for ASIN {asin}: {e}")
-                raise
-            except Exception as e:
-                print(f"Unexpected error while processing ASIN {asin}: {e}")
-                raise
+        try:
+            # Get basic product info
+            product_info = await product_service.get_product_fields(asin, ["description", "specifications"])
+
+            # Get product sage info
+            product_sage = await product_service.get_sage(asin)
+            product_info["sentiments"] = product_sage["sentiments"]
+            product_info["improvements"] = product_sage["improvements"]
+
+            # Get web reviewer info
+            product_info["web_reviewer"] = await product_service.get_web_reviews(asin)
+
+            return product_info
+
+        except Exception as e:
+            print(f"Unexpected error while processing ASIN {asin}: {e}")
+            raise
     
     def process_swot_components(self, data: Dict) -> Dict:
         """Extract SWOT components from structured data"""
@@ -165,6 +147,6 @@ class Swot:
         prompt = self.generate_comparison_prompt(main_components, 
                                          competitor_components)
         
-        response = self.llm.invoke(prompt)
-        output = self.parser_consolidated.parse(response.content)
+        response = await self.llm.ainvoke(prompt)
+        output = await parse_output("swot", response.content, SwotAnalysisConsolidated)
         return output
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+Record/replay stand-in for the service's external dependencies.
+
+REPLAY_MODE=record lets every call through and stores its response under
+REPLAY_DIR; REPLAY_MODE=replay serves those responses without touching the
+network, so ProductSage, WebReviewer, ProductEnhancer and Swot run offline.
+Two hooks cover the dependencies:
+- `replay_transport` for httpx clients (OpenAI and Groq through the model
+  registry, r.jina.ai),
+- `replayed` for anything else that returns JSON-compatible data (SerpAPI
+  results, Amazon pages from the Playwright scraper).
+
+Replayed calls sleep for a latency drawn from REPLAY_LATENCY and fail with
+probability REPLAY_ERROR_RATE. Both take a single value or per-source values,
+e.g. "llm=lognormal:900:0.4,serpapi=fixed:300,*=recorded" and "llm=0.05".
+Latency specs: recorded, fixed:<ms>, uniform:<min_ms>:<max_ms>,
+lognormal:<median_ms>:<sigma>. Set LLM_CACHE_ENABLED=false when
+benchmarking, or cached responses skip the replayed provider entirely.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar, Union
+
+import httpx
+
+from ...config.main import settings
+
+T = TypeVar("T")
+
+# response headers that no longer describe the stored (decoded) body
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+
+class ReplayMissError(LookupError):
+    """Replay mode found no recorded response for a request."""
+
+
+class InjectedError(Exception):
+    """A failure injected by REPLAY_ERROR_RATE."""
+
+
+def _per_source(spec: str) -> Dict[str, str]:
+    if "=" not in spec:
+        return {"*": spec.strip()}
+    return dict(entry.strip().split("=", 1) for entry in spec.split(",") if entry.strip())
+
+
+class Replay:
+    def __init__(self, mode: str, directory: str, latency: str, error_rate: str, seed: Optional[int]):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown REPLAY_MODE: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.latency = _per_source(latency)
+        self.error_rate = {source: float(rate) for source, rate in _per_source(error_rate).items()}
+        self.random = random.Random(seed)
+        self._lock = Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _count(self, source: str, outcome: str):
+        with self._lock:
+            counts = self.counts.setdefault(source, {"recorded": 0, "replayed": 0, "missed": 0, "injected_errors": 0})
+            counts[outcome] += 1
+
+    def _path(self, source: str, key: str) -> str:
+        return os.path.join(self.directory, source, f"{key}.json")
+
+    def save(self, source: str, key: str, latency: float, request: Any, response: Any):
+        path = self._path(source, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"request": request, "latency": latency, "response": response}, f, ensure_ascii=False)
+        self._count(source, "recorded")
+
+    def load(self, source: str, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(source, key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self._count(source, "missed")
+            raise ReplayMissError(f"No recorded {source} response {key} in {self.directory}")
+        self._count(source, "replayed")
+        return entry
+
+    def delay(self, source: str, recorded: float) -> float:
+        """Seconds to wait before answering a replayed call."""
+        kind, *args = self.latency.get(source, self.latency.get("*", "recorded")).split(":")
+        values = [float(arg) / 1000 for arg in args[:2]]
+        if kind == "fixed":
+            return values[0]
+        if kind == "uniform":
+            return self.random.uniform(values[0], values[1])
+        if kind == "lognormal":
+            return self.random.lognormvariate(math.log(values[0]), float(args[1]))
+        return recorded
+
+    def should_fail(self, source: str) -> bool:
+        if self.random.random() < self.error_rate.get(source, self.error_rate.get("*", 0.0)):
+            self._count(source, "injected_errors")
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "sources": {source: dict(counts) for source, counts in self.counts.items()}}
+
+
+replay = Replay(
+    settings.REPLAY_MODE,
+    settings.REPLAY_DIR,
+    settings.REPLAY_LATENCY,
+    settings.REPLAY_ERROR_RATE,
+    settings.REPLAY_SEED,
+)
+
+
+def _key(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+async def replayed(source: str, request: Any, call: Callable[[], Awaitable[T]]) -> T:
+    """await call(), or its recorded result; `request` must identify the call and be JSON-compatible."""
+    if not replay.enabled:
+        return await call()
+    key = _key(request)
+    if replay.mode == "record":
+        started = time.monotonic()
+        result = await call()
+        replay.save(source, key, time.monotonic() - started, request, result)
+        return result
+
+    entry = replay.load(source, key)
+    await asyncio.sleep(replay.delay(source, entry["latency"]))
+    if replay.should_fail(source):
+        raise InjectedError(f"Injected {source} failure")
+    return entry["response"]
+
+
+def _request_key(request: httpx.Request, body: bytes) -> Tuple[str, Dict[str, Any]]:
+    # credentials travel in headers, which are neither keyed nor stored
+    described = {"method": request.method, "url": str(request.url), "body": body.decode("utf-8", "replace")}
+    return _key(described), described
+
+
+def _dump_response(response: httpx.Response) -> Dict[str, Any]:
+    return {
+        "status": response.status_code,
+        "headers": {name: value for name, value in response.headers.items() if name.lower() not in DROPPED_HEADERS},
+        "body": base64.b64encode(response.content).decode("ascii"),
+    }
+
+
+def _load_response(stored: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+    return httpx.Response(stored["status"], headers=stored["headers"], content=base64.b64decode(stored["body"]), request=request)
+
+
+def _replayed_response(source: str, key: str, request: httpx.Request) -> Tuple[Optional[Dict[str, Any]], Optional[httpx.Response]]:
+    try:
+        return replay.load(source, key), None
+    except ReplayMissError as e:
+        # a 404 is not retried, so a missing fixture fails fast instead of backing off
+        return None, httpx.Response(404, json={"error": {"message": str(e)}}, request=request)
+
+
+def _injected_response(request: httpx.Request) -> httpx.Response:
+    # a 503 goes through the same retry and fallback paths as a real outage
+    return httpx.Response(503, json={"error": {"message": "Injected failure"}}, request=request)
+
+
+class ReplayTransport(httpx.AsyncBaseTransport, httpx.BaseTransport):
+    """httpx transport that records through `inner` or answers from fixtures."""
+
+    def __init__(self, source: str, inner: Union[httpx.AsyncBaseTransport, httpx.BaseTransport]):
+        self.source = source
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key, described = _request_key(request, await request.aread())
+        if replay.mode == "record":
+            started = time.monotonic()
+            response = await self.inner.handle_async_request(request)
+            await response.aread()
+            replay.save(self.source, key, time.monotonic() - started, described, _dump_response(response))
+            return response
+
+        entry, missing = _replayed_response(self.source, key, request)
+        if missing is not None:
+            return missing
+        await asyncio.sleep(replay.delay(self.source, entry["latency"]))
+        return _injected_response(request) if replay.should_fail(self.source) else _load_response(entry["response"], request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key, described = _request_key(request, request.read())
+        if replay.mode == "record":
+            started = time.monotonic()
+            response = self.inner.handle_request(request)
+            response.read()
+            replay.save(self.source, key, time.monotonic() - started, described, _dump_response(response))
+            return response
+
+        entry, missing = _replayed_response(self.source, key, request)
+        if missing is not None:
+            return missing
+        time.sleep(replay.delay(self.source, entry["latency"]))
+        return _injected_response(request) if replay.should_fail(self.source) else _load_response(entry["response"], request)
+
+    async def aclose(self):
+        if isinstance(self.inner, httpx.AsyncBaseTransport):
+            await self.inner.aclose()
+
+    def close(self):
+        if isinstance(self.inner, httpx.BaseTransport):
+            self.inner.close()
+
+
+def replay_transport(source: str, sync: bool = False, **options: Any) -> Optional[ReplayTransport]:
+    """
+    A transport for an httpx client, None (httpx's default) when replay is off.
+    `options` configure the real transport used while recording.
+    """
+    if not replay.enabled:
+        return None
+    inner = httpx.HTTPTransport(**options) if sync else httpx.AsyncHTTPTransport(**options)
+    return ReplayTransport(source, inner)
@@ -1,24 +1,398 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from statistics import quantiles
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
+from ..app.llm.scheduler import ainvoke, is_cached
+from ..app.utils.replay import replay_transport
 from ..config.main import settings
 
+
+@dataclass(frozen=True)
+class ModelSpec:
+    provider: str
+    model: str
+    temperature: float
+    json_mode: bool = False
+
+
+# every model the app calls, by the name modules resolve it with; the chains
+# all parse JSON, so they use the providers' JSON mode
+MODEL_SPECS: Dict[str, ModelSpec] = {
+    "gpt-4o": ModelSpec("openai", "gpt-4o", 0.7),
+    "review-translation": ModelSpec("openai", "gpt-4o-mini", 0.3, json_mode=True),
+    "review-sentiment": ModelSpec("openai", "gpt-4o-mini", 0.1, json_mode=True),
+    "review-batch-analysis": ModelSpec("openai", "gpt-4o-mini", 0.1, json_mode=True),
+    "product-improvement": ModelSpec("openai", "gpt-4o-mini", 0.1, json_mode=True),
+    "output-repair": ModelSpec("openai", "gpt-4o-mini", 0.0, json_mode=True),
+    "llama-4-maverick": ModelSpec("groq", "meta-llama/llama-4-maverick-17b-128e-instruct", 0.7, json_mode=True),
+    "llama-3.3-70b": ModelSpec("groq", "llama-3.3-70b-versatile", 0.7, json_mode=True),
+}
+
+
+# models that can stand in for each other; a handle's route tries the others
+# of the first class listing its own model, with the handle's temperature and format
+EQUIVALENT_MODELS: List[List[Tuple[str, str]]] = [
+    [("openai", "gpt-4o"), ("groq", "meta-llama/llama-4-maverick-17b-128e-instruct"), ("groq", "llama-3.3-70b-versatile")],
+    [("openai", "gpt-4o-mini"), ("groq", "llama-3.3-70b-versatile")],
+]
+
+
+class HandleMetrics(BaseCallbackHandler):
+    """Call count, errors and latency of one model handle, fed by langchain callbacks."""
+
+    def __init__(self, window: int = 256):
+        self._lock = Lock()
+        self._started: Dict[Any, float] = {}
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            self.calls += 1
+            if started is not None:
+                self.latencies.append(time.perf_counter() - started)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._started.pop(run_id, None)
+            self.calls += 1
+            self.errors += 1
+
+    def percentile(self, percent: int) -> Optional[float]:
+        with self._lock:
+            latencies = list(self.latencies)
+        if len(latencies) < 2:
+            return latencies[0] if latencies else None
+        return quantiles(latencies, n=100)[percent - 1]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class ModelRegistry:
+    """
+    Named model handles built once per process. Handles of the same provider
+    share one sync and one async HTTP client, so connections (HTTP/2 when
+    LLM_HTTP2 is set) are reused across requests and chains.
+    """
+
+    def __init__(self, specs: Dict[str, ModelSpec]):
+        self.specs = specs
+        self._models: Dict[str, BaseChatModel] = {}
+        self._metrics: Dict[str, HandleMetrics] = {}
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[str, httpx.AsyncClient] = {}
+        self._routes: Dict[str, Route] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _client_options() -> Dict[str, Any]:
+        return {
+            "http2": settings.LLM_HTTP2,
+            "timeout": settings.LLM_HTTP_TIMEOUT,
+            "limits": httpx.Limits(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            ),
+        }
+
+    def _http_clients(self, provider: str):
+        if provider not in self._clients:
+            options = self._client_options()
+            # None unless REPLAY_MODE is set, then calls are recorded or answered from fixtures
+            transport_options = {"http2": options["http2"], "limits": options["limits"]}
+            self._clients[provider] = httpx.Client(**options, transport=replay_transport("llm", sync=True, **transport_options))
+            self._async_clients[provider] = httpx.AsyncClient(**options, transport=replay_transport("llm", **transport_options))
+        return self._clients[provider], self._async_clients[provider]
+
+    def _build(self, name: str) -> BaseChatModel:
+        spec = self.specs[name]
+        http_client, http_async_client = self._http_clients(spec.provider)
+        metrics = self._metrics[name] = HandleMetrics()
+        options = {
+            "model": spec.model,
+            "temperature": spec.temperature,
+            "http_client": http_client,
+            "http_async_client": http_async_client,
+            "callbacks": [metrics],
+            # retries are left to the app's LLM scheduler, which knows about every caller
+            "max_retries": 0,
+        }
+        if spec.json_mode:
+            options["model_kwargs"] = {"response_format": {"type": "json_object"}}
+        if spec.provider == "openai":
+            return ChatOpenAI(api_key=settings.OPENAI_API_KEY, **options)
+        if spec.provider == "groq":
+            return ChatGroq(api_key=settings.GROQ_API_KEY, **options)
+        raise ValueError(f"Unknown LLM provider: {spec.provider}")
+
+    def get(self, name: str) -> BaseChatModel:
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self._build(name)
+            return self._models[name]
+
+    def alternates(self, name: str) -> List[str]:
+        """Handles for the models equivalent to name's, registered on first use."""
+        spec = self.specs[name]
+        equivalent = next((models for models in EQUIVALENT_MODELS if (spec.provider, spec.model) in models), [])
+        names = []
+        for provider, model in equivalent:
+            if (provider, model) == (spec.provider, spec.model):
+                continue
+            alternate = f"{name}@{model}"
+            self.specs.setdefault(alternate, replace(spec, provider=provider, model=model))
+            names.append(alternate)
+        return names
+
+    def route(self, name: str) -> "Route":
+        with self._lock:
+            if name not in self._routes:
+                self._routes[name] = Route(self, name)
+            return self._routes[name]
+
+    def metrics(self, name: str) -> Optional[HandleMetrics]:
+        return self._metrics.get(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {"provider": self.specs[name].provider, "model": self.specs[name].model, **metrics.stats()}
+            for name, metrics in self._metrics.items()
+        }
+
+    def router_stats(self) -> Dict[str, Any]:
+        return {
+            "models": {f"{provider}/{model}": health.stats() for (provider, model), health in model_health.items()},
+            "routes": {name: route.stats() for name, route in self._routes.items()},
+        }
+
+    async def aclose(self):
+        for client in self._async_clients.values():
+            await client.aclose()
+        for client in self._clients.values():
+            client.close()
+        self._models.clear()
+        self._clients.clear()
+        self._async_clients.clear()
+
+
+class ModelHealth:
+    """Latency and outcome of recent provider calls to one model, over LLM_ROUTER_WINDOW_SECONDS."""
+
+    def __init__(self):
+        self.latencies: deque = deque()
+        self.outcomes: deque = deque()
+
+    def _trim(self):
+        cutoff = time.monotonic() - settings.LLM_ROUTER_WINDOW_SECONDS
+        for samples in (self.latencies, self.outcomes):
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+
+    def record(self, latency: Optional[float]):
+        """A finished call; latency None for a failure."""
+        now = time.monotonic()
+        self.outcomes.append((now, latency is not None))
+        if latency is not None:
+            self.latencies.append((now, latency))
+        self._trim()
+
+    def percentile(self, percent: int) -> Optional[float]:
+        self._trim()
+        if len(self.latencies) < settings.LLM_ROUTER_MIN_SAMPLES:
+            return None
+        return quantiles([latency for _, latency in self.latencies], n=100)[percent - 1]
+
+    def error_rate(self) -> float:
+        self._trim()
+        if len(self.outcomes) < settings.LLM_ROUTER_MIN_SAMPLES:
+            return 0.0
+        return sum(not ok for _, ok in self.outcomes) / len(self.outcomes)
+
+    def healthy(self) -> bool:
+        # failing models get no traffic, their window empties and they are tried again
+        return self.error_rate() < settings.LLM_ROUTER_MAX_ERROR_RATE
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": len(self.outcomes),
+            "error_rate": round(self.error_rate(), 4),
+            "healthy": self.healthy(),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+# shared by every route, health is a property of the provider's model
+model_health: Dict[Tuple[str, str], ModelHealth] = {}
+
+
+def _health(spec: ModelSpec) -> ModelHealth:
+    return model_health.setdefault((spec.provider, spec.model), ModelHealth())
+
+
+class Route:
+    """
+    A handle and its equivalent models. Each call goes to the fastest healthy
+    candidate (models without enough samples are tried first, in configured
+    order). If it has not answered within its LLM_HEDGE_PERCENTILE latency, the
+    same call is sent to the best candidate of another provider and the
+    slower of the two is cancelled. A failed call falls back to the next
+    candidate. Latency is measured as callers see it, scheduler queueing and
+    retries included; every routed call is logged with the model that answered.
+    """
+
+    def __init__(self, registry: ModelRegistry, name: str):
+        self.registry = registry
+        self.name = name
+        self.candidates = [name, *registry.alternates(name)] if settings.LLM_ROUTER_ENABLED else [name]
+        self.calls = 0
+        self.cached = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.winners: Dict[str, int] = {}
+
+    def _spec(self, name: str) -> ModelSpec:
+        return self.registry.specs[name]
+
+    def rank(self) -> List[str]:
+        def key(name: str):
+            health = _health(self._spec(name))
+            return not health.healthy(), health.percentile(50) or 0.0
+        return sorted(self.candidates, key=key)
+
+    def _hedge_delay(self, name: str) -> float:
+        latency = _health(self._spec(name)).percentile(settings.LLM_HEDGE_PERCENTILE)
+        return max(latency, settings.LLM_HEDGE_MIN_DELAY) if latency is not None else settings.LLM_HEDGE_DELAY
+
+    async def _attempt(self, name: str, input: Any) -> Any:
+        health = _health(self._spec(name))
+        started = time.monotonic()
+        try:
+            # the route already looked its own handle up in the cache, alternates look themselves up
+            result = await ainvoke(self.registry.get(name), input, cached=False if name == self.name else None)
+        except asyncio.CancelledError:
+            # the losing side of a hedge says nothing about the model
+            raise
+        except Exception:
+            health.record(None)
+            raise
+        health.record(time.monotonic() - started)
+        return result
+
+    async def ainvoke(self, input: Any) -> Any:
+        self.calls += 1
+        # only the handle itself is looked up, alternates (and their HTTP
+        # clients) are built when a hedge or fallback first tries them
+        llm = self.registry.get(self.name)
+        if await is_cached(llm, input):
+            self.cached += 1
+            return await llm.ainvoke(input)
+
+        ranked = self.rank()
+        primary = ranked[0]
+        hedge = next((name for name in ranked[1:] if self._spec(name).provider != self._spec(primary).provider), None)
+        remaining = list(ranked[1:])
+        started = time.monotonic()
+        running: Dict[asyncio.Future, str] = {asyncio.ensure_future(self._attempt(primary, input)): primary}
+        events: List[str] = []
+        error: Optional[Exception] = None
+        won = False
+        try:
+            while running:
+                timeout = self._hedge_delay(primary) - (time.monotonic() - started) if hedge in remaining else None
+                done, _ = await asyncio.wait(running, timeout=max(timeout, 0) if timeout is not None else None, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    events.append(f"hedged to {hedge}")
+                    remaining.remove(hedge)
+                    running[asyncio.ensure_future(self._attempt(hedge, input))] = hedge
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        won = True
+                        return self._won(name, primary, task.result(), started, events)
+                    error = task.exception()
+                    events.append(f"{name} failed: {type(error).__name__}")
+                if not running and remaining:
+                    fallback = remaining.pop(0)
+                    self.fallbacks += 1
+                    events.append(f"fell back to {fallback}")
+                    running[asyncio.ensure_future(self._attempt(fallback, input))] = fallback
+            self.failures += 1
+            print(f"LLM route {self.name}: all candidates failed ({'; '.join(events)})")
+            raise error
+        finally:
+            for task, name in running.items():
+                if won and not task.done():
+                    # a hedged loser took at least this long, record it so its percentiles catch up
+                    _health(self._spec(name)).record(time.monotonic() - started)
+                task.cancel()
+
+    def _won(self, name: str, primary: str, result: Any, started: float, events: List[str]) -> Any:
+        self.winners[name] = self.winners.get(name, 0) + 1
+        if name != primary and any(event.startswith("hedged") for event in events):
+            self.hedge_wins += 1
+        spec = self._spec(name)
+        tokens = (getattr(result, "usage_metadata", None) or {}).get("total_tokens")
+        detail = f" ({'; '.join(events)})" if events else ""
+        print(f"LLM route {self.name}: {spec.provider}/{spec.model} in {(time.monotonic() - started) * 1000:.0f}ms, {tokens} tokens{detail}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "cached": self.cached,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+            "winners": dict(self.winners),
+            "ranking": self.rank(),
+        }
+
+
+models = ModelRegistry(MODEL_SPECS)
+
+
 class AIModels:
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(AIModels, cls).__new__(cls)
-            cls._instance.initialize()
         return cls._instance
-    
-    def initialize(self):
-        self.chatgpt_4o_model = ChatOpenAI(model="gpt-4o", temperature=0.7, api_key=settings.OPENAI_API_KEY)
-        self.llama_4_mavrick_model = ChatGroq(temperature=0.7, model="meta-llama/llama-4-maverick-17b-128e-instruct", api_key=settings.GROQ_API_KEY)
-        self.llama_3_8b_model = ChatGroq(temperature=0.7, model="llama-3.3-70b-versatile", api_key=settings.GROQ_API_KEY)
 
     def chatgpt_4o(self):
-        return self.chatgpt_4o_model
-    
+        return models.get("gpt-4o")
+
     def llama_4_mavrick(self):
-        return self.llama_4_mavrick_model
-    
\ No newline at end of file
+        return models.get("llama-4-maverick")
+
+    def llama_3_8b(self):
+        return models.get("llama-3.3-70b")
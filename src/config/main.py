@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
+from typing import Optional
 load_dotenv()
 
 class Settings(BaseSettings):
@@ -15,6 +16,85 @@ class Settings(BaseSettings):
 
     BACKEND_URL: str = os.getenv("BACKEND_URL")
 
+    SCRAPER_POOL_SIZE: int = int(os.getenv("SCRAPER_POOL_SIZE", 2))
+    SCRAPER_MAX_PAGES: int = int(os.getenv("SCRAPER_MAX_PAGES", 4))
+    SCRAPER_RECYCLE_AFTER: int = int(os.getenv("SCRAPER_RECYCLE_AFTER", 50))
+    SCRAPER_BLOCK_RESOURCES: bool = os.getenv("SCRAPER_BLOCK_RESOURCES", "true").lower() == "true"
+    SCRAPER_PARSER: str = os.getenv("SCRAPER_PARSER", "lxml")
+    PARSER_WORKERS: int = int(os.getenv("PARSER_WORKERS", 2))
+
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", 4))
+    BATCH_MAX_ASINS: int = int(os.getenv("BATCH_MAX_ASINS", 5000))
+    BATCH_FLUSH_SECONDS: float = float(os.getenv("BATCH_FLUSH_SECONDS", 5))
+
+    PRODUCT_TTL_HOURS: float = float(os.getenv("PRODUCT_TTL_HOURS", 72))
+    REFRESH_BUDGET_PER_MINUTE: int = int(os.getenv("REFRESH_BUDGET_PER_MINUTE", 5))
+    REFRESH_SWEEP_INTERVAL: int = int(os.getenv("REFRESH_SWEEP_INTERVAL", 60))
+    REFRESH_RETRY_BACKOFF: float = float(os.getenv("REFRESH_RETRY_BACKOFF", 300))
+    REFRESH_RETRY_MAX_BACKOFF: float = float(os.getenv("REFRESH_RETRY_MAX_BACKOFF", 6 * 60 * 60))
+
+    DB_CACHE_MAX_BYTES: int = int(os.getenv("DB_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    DB_CACHE_TTL_SECONDS: float = float(os.getenv("DB_CACHE_TTL_SECONDS", 300))
+    UPSERT_BATCH_SIZE: int = int(os.getenv("UPSERT_BATCH_SIZE", 500))
+
+    # per engine and per uvicorn worker, the sync and async engines each hold a pool
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_RETRY_ATTEMPTS: int = int(os.getenv("DB_RETRY_ATTEMPTS", 3))
+    DB_RETRY_BACKOFF: float = float(os.getenv("DB_RETRY_BACKOFF", 0.5))
+
+    REVIEW_BATCH_TOKENS: int = int(os.getenv("REVIEW_BATCH_TOKENS", 2000))
+    REVIEW_BATCH_MAX_REVIEWS: int = int(os.getenv("REVIEW_BATCH_MAX_REVIEWS", 20))
+    # regenerate a sage's improvements once the sentiment mix moves this far (total variation distance)
+    SAGE_IMPROVEMENT_MIX_THRESHOLD: float = float(os.getenv("SAGE_IMPROVEMENT_MIX_THRESHOLD", 0.1))
+    # reviews analysed per product after near-duplicate removal, the rest are sampled
+    SAGE_MAX_REVIEWS: int = int(os.getenv("SAGE_MAX_REVIEWS", 50))
+    SAGE_DEDUPE_THRESHOLD: float = float(os.getenv("SAGE_DEDUPE_THRESHOLD", 0.8))
+    SAGE_MINHASH_PERMUTATIONS: int = int(os.getenv("SAGE_MINHASH_PERMUTATIONS", 32))
+
+    LANGUAGE_DETECTION_THRESHOLD: float = float(os.getenv("LANGUAGE_DETECTION_THRESHOLD", 0.8))
+    # share of common English words at which a latin text counts as fully English
+    LANGUAGE_DETECTION_ENGLISH_RATIO: float = float(os.getenv("LANGUAGE_DETECTION_ENGLISH_RATIO", 0.4))
+    LANGUAGE_DETECTION_MIN_WORDS: int = int(os.getenv("LANGUAGE_DETECTION_MIN_WORDS", 2))
+
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+    # per model, shared by every request in the process
+    LLM_OPENAI_CONCURRENCY: int = int(os.getenv("LLM_OPENAI_CONCURRENCY", 8))
+    LLM_OPENAI_RPM: int = int(os.getenv("LLM_OPENAI_RPM", 500))
+    LLM_OPENAI_TPM: int = int(os.getenv("LLM_OPENAI_TPM", 200000))
+    LLM_GROQ_CONCURRENCY: int = int(os.getenv("LLM_GROQ_CONCURRENCY", 4))
+    LLM_GROQ_RPM: int = int(os.getenv("LLM_GROQ_RPM", 30))
+    LLM_GROQ_TPM: int = int(os.getenv("LLM_GROQ_TPM", 30000))
+    LLM_COMPLETION_TOKENS_ESTIMATE: int = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", 512))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 4))
+    LLM_BACKOFF_BASE: float = float(os.getenv("LLM_BACKOFF_BASE", 1.0))
+    LLM_BACKOFF_MAX: float = float(os.getenv("LLM_BACKOFF_MAX", 30.0))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_HTTP_TIMEOUT: float = float(os.getenv("LLM_HTTP_TIMEOUT", 60.0))
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20))
+    LLM_ROUTER_ENABLED: bool = os.getenv("LLM_ROUTER_ENABLED", "true").lower() == "true"
+    LLM_ROUTER_WINDOW_SECONDS: float = float(os.getenv("LLM_ROUTER_WINDOW_SECONDS", 300))
+    LLM_ROUTER_MIN_SAMPLES: int = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", 5))
+    LLM_ROUTER_MAX_ERROR_RATE: float = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", 0.5))
+    LLM_HEDGE_PERCENTILE: int = int(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", 1.0))
+    # hedge delay while a model has too few samples for a percentile
+    LLM_HEDGE_DELAY: float = float(os.getenv("LLM_HEDGE_DELAY", 15.0))
+
+    # off, record or replay; see app/utils/replay.py for the latency and error specs
+    REPLAY_MODE: str = os.getenv("REPLAY_MODE", "off")
+    REPLAY_DIR: str = os.getenv("REPLAY_DIR", "fixtures/replay")
+    REPLAY_LATENCY: str = os.getenv("REPLAY_LATENCY", "recorded")
+    REPLAY_ERROR_RATE: str = os.getenv("REPLAY_ERROR_RATE", "0")
+    REPLAY_SEED: Optional[int] = int(os.getenv("REPLAY_SEED")) if os.getenv("REPLAY_SEED") else None
+
 
     
     class Config: